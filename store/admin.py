@@ -1,9 +1,20 @@
+from django import forms
 from django.contrib import admin, messages
-from django.db.models.aggregates import Count
+from django.contrib.admin.helpers import ActionForm
 from django.db.models.query import QuerySet
 from django.utils.html import format_html, urlencode
 from django.urls import reverse
-from . import models
+from . import jobs, models
+from .pagination import EstimatedCountPaginator
+
+
+class EstimatedCountMixin:
+    """
+    Count the changelist with EstimatedCountPaginator instead of COUNT(*),
+    and skip the second count of the unfiltered total.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class InventoryFilter(admin.SimpleListFilter):
@@ -20,13 +31,20 @@ class InventoryFilter(admin.SimpleListFilter):
             return queryset.filter(inventory__lt=10)
 
 
+class ProductActionForm(ActionForm):
+    percent = forms.DecimalField(
+        required=False, max_digits=5, decimal_places=2, min_value=-99, max_value=999,
+        label='Percentage', help_text='For price adjustments, e.g. 10 or -5')
+
+
 @admin.register(models.Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(EstimatedCountMixin, admin.ModelAdmin):
+    action_form = ProductActionForm
     autocomplete_fields = ['collection']
     prepopulated_fields = {
         'slug': ['title']
     }
-    actions = ['clear_inventory']
+    actions = ['clear_inventory', 'adjust_prices']
     list_display = ['title', 'unit_price',
                     'inventory_status', 'collection_title']
     list_editable = ['unit_price']
@@ -44,15 +62,30 @@ class ProductAdmin(admin.ModelAdmin):
             return 'Low'
         return 'OK'
 
-    @admin.action(description='Clear inventory')
-    def clear_inventory(self, request, queryset):
-        updated_count = queryset.update(inventory=0)
+    def enqueue(self, request, queryset, name, params=None, description=None):
+        job = jobs.enqueue(name, queryset, params, request.user, description)
+        url = reverse('admin:store_adminjob_change', args=[job.pk])
         self.message_user(
             request,
-            f'{updated_count} products were successfully updated.',
-            messages.ERROR
+            format_html('<a href="{}">{}</a> was queued for {} products.', url, job, job.total),
+            messages.SUCCESS
         )
 
+    @admin.action(description='Clear inventory')
+    def clear_inventory(self, request, queryset):
+        self.enqueue(request, queryset, 'clear_inventory')
+
+    @admin.action(description='Adjust prices by the percentage')
+    def adjust_prices(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        percent = form.cleaned_data['percent'] if form.is_valid() else None
+        if percent is None:
+            self.message_user(request, 'Enter the percentage to adjust prices by.', messages.ERROR)
+            return
+        self.enqueue(request, queryset, 'adjust_prices', {'percent': str(percent)},
+                     f'Adjust prices by {percent:+}%')
+
 
 @admin.register(models.Collection)
 class CollectionAdmin(admin.ModelAdmin):
@@ -70,14 +103,9 @@ class CollectionAdmin(admin.ModelAdmin):
             }))
         return format_html('<a href="{}">{} Products</a>', url, collection.products_count)
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(
-            products_count=Count('product')
-        )
-
 
 @admin.register(models.Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(EstimatedCountMixin, admin.ModelAdmin):
     list_display = ['first_name', 'last_name',  'membership', 'orders']
     list_editable = ['membership']
     list_per_page = 10
@@ -94,11 +122,6 @@ class CustomerAdmin(admin.ModelAdmin):
             }))
         return format_html('<a href="{}">{} Orders</a>', url, customer.orders_count)
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(
-            orders_count=Count('order')
-        )
-
 
 class OrderItemInline(admin.TabularInline):
     autocomplete_fields = ['product']
@@ -109,7 +132,44 @@ class OrderItemInline(admin.TabularInline):
 
 
 @admin.register(models.Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(EstimatedCountMixin, admin.ModelAdmin):
     autocomplete_fields = ['customer']
     inlines = [OrderItemInline]
-    list_display = ['id', 'placed_at', 'customer']
+    list_display = ['id', 'placed_at', 'customer', 'item_count', 'total']
+    list_select_related = ['customer']
+    readonly_fields = ['item_count', 'total']
+
+
+class FailedChunkInline(admin.TabularInline):
+    model = models.AdminJobChunk
+    fields = ['id', 'changed', 'error']
+    readonly_fields = fields
+    verbose_name_plural = 'failed chunks'
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(status=models.AdminJobChunk.STATUS_FAILED)
+
+
+@admin.register(models.AdminJob)
+class AdminJobAdmin(admin.ModelAdmin):
+    inlines = [FailedChunkInline]
+    list_display = ['id', 'description', 'user', 'status', 'progress',
+                    'changed', 'created_at', 'finished_at']
+    list_filter = ['status', 'action']
+    list_select_related = ['user']
+    fields = ['description', 'user', 'status', 'progress', 'changed', 'failed',
+              'params', 'created_at', 'finished_at']
+    readonly_fields = fields
+
+    @admin.display(description='progress')
+    def progress(self, job):
+        done = job.processed + job.failed
+        return format_html(
+            '<progress value="{}" max="{}"></progress> {} / {}', done, job.total or 1, done, job.total)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,122 @@
+"""
+Daily sales rollup.
+
+DailySales holds the orders, units and revenue of every product on every
+day it sold, so reports read a few rows per day instead of scanning the
+order lines. Days are calendar days in the current time zone.
+
+The rollup is refreshed day by day: a day is recomputed from its order
+lines and swapped in whole, which makes a refresh idempotent. An
+incremental refresh only recomputes the days of orders whose updated_at
+moved past the 'sales' watermark; store.signals moves an order's
+updated_at whenever one of its lines is saved or deleted. Lines written
+with bulk_create or update() must update their order themselves, as
+checkout does by creating it. Deleting an order leaves no trace of its
+day, so rebuild the days from a date on with `since` afterwards.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import DailySales, Order, OrderItem, Watermark
+
+
+SALES = 'sales'
+
+# Orders committed late by a transaction that started before a refresh
+# carry an updated_at from before it; they are picked up by the next run.
+SAFETY_MARGIN = timedelta(minutes=5)
+
+
+def start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def touched_days(since):
+    """Return the days of the orders updated after `since`."""
+    return list(Order.objects
+                .filter(updated_at__gt=since)
+                .dates('placed_at', 'day'))
+
+
+# Chunks are aggregated straight into the rollup, no row passes through Python
+INSERT_SALES = """
+INSERT INTO store_dailysales (day, product_id, collection_id, orders, units, revenue)
+SELECT day, product_id, product__collection_id, orders, units, revenue FROM ({}) AS sales
+"""
+
+
+def aggregate(days):
+    """Return the DailySales rows of the given days as computed from the order lines."""
+    placed = Q()
+    for day in days:
+        placed |= Q(order__placed_at__gte=start_of(day),
+                    order__placed_at__lt=start_of(day + timedelta(days=1)))
+    return OrderItem.objects \
+        .filter(placed) \
+        .annotate(day=TruncDate('order__placed_at')) \
+        .order_by() \
+        .values('day', 'product_id', 'product__collection_id') \
+        .annotate(
+            orders=Count('order_id', distinct=True),
+            units=Sum('quantity'),
+            revenue=Sum(ExpressionWrapper(
+                F('quantity') * F('unit_price'),
+                output_field=DecimalField(max_digits=14, decimal_places=2))))
+
+
+def refresh_days(days, chunk_size=7):
+    """
+    Recompute the rollup of the given days, `chunk_size` days per transaction.
+
+    Returns the number of DailySales rows written.
+    """
+    days = sorted(set(days))
+    written = 0
+    for i in range(0, len(days), chunk_size):
+        chunk = days[i:i + chunk_size]
+        sql, params = aggregate(chunk).query.sql_with_params()
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Concurrent refreshers take turns per chunk, so the delete and
+            # insert of a day never interleave.
+            _lock_watermark()
+            DailySales.objects.filter(day__in=chunk).delete()
+            cursor.execute(INSERT_SALES.format(sql), params)
+            written += cursor.rowcount
+    return written
+
+
+def _lock_watermark():
+    Watermark.objects.bulk_create(
+        [Watermark(name=SALES, value=datetime.min.replace(tzinfo=dt_timezone.utc))],
+        ignore_conflicts=True)
+    return Watermark.objects.select_for_update().get(name=SALES)
+
+
+def refresh(full=False, since=None, chunk_size=7):
+    """
+    Bring the rollup up to date and move the watermark.
+
+    Recomputes the days touched since the watermark, plus every day from
+    the date `since` on, or every day with `full`; rebuilt days left
+    without orders are dropped. Returns (days refreshed, rows written).
+    """
+    start = timezone.now()
+    with transaction.atomic():
+        watermark = _lock_watermark().value
+    days = set(touched_days(watermark))
+
+    if full or since is not None:
+        orders = Order.objects.all()
+        stale = DailySales.objects.all()
+        if not full:
+            orders = orders.filter(placed_at__gte=start_of(since))
+            stale = stale.filter(day__gte=since)
+        rebuilt = list(orders.dates('placed_at', 'day'))
+        stale.exclude(day__in=rebuilt).delete()
+        days.update(rebuilt)
+
+    written = refresh_days(days, chunk_size)
+    Watermark.objects.filter(name=SALES).update(value=start - SAFETY_MARGIN)
+    return len(days), written
@@ -0,0 +1,133 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+CATALOG = 'catalog'
+
+
+def get_cache():
+    return caches[getattr(settings, 'STORE_CACHE_ALIAS', 'default')]
+
+
+def is_process_local(cache):
+    """True for caches that other processes (workers, commands) cannot see."""
+    return isinstance(cache, (LocMemCache, DummyCache))
+
+
+def _version_key(namespace):
+    return f'store:version:{namespace}'
+
+
+def get_version(namespace):
+    """Return the current version of a namespace, seeding it if missing."""
+    cache = get_cache()
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never comes back at a
+        # value that older entries were stored under.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """
+    Invalidate every entry stored under the namespace's current version.
+
+    Inside a transaction the bump waits for the commit, so a concurrent
+    read cannot cache rows from before the commit under the new version.
+    """
+    transaction.on_commit(lambda: _bump_version(namespace))
+
+
+def _bump_version(namespace):
+    cache = get_cache()
+    try:
+        return cache.incr(_version_key(namespace))
+    except ValueError:
+        return get_version(namespace)
+
+
+def _incr_counter(name):
+    cache = get_cache()
+    key = f'store:stats:{name}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def cache_stats(namespace=CATALOG):
+    cache = get_cache()
+    return {
+        'hits': cache.get(f'store:stats:{namespace}:hits', 0),
+        'misses': cache.get(f'store:stats:{namespace}:misses', 0),
+    }
+
+
+def reset_cache_stats(namespace=CATALOG):
+    get_cache().delete_many([
+        f'store:stats:{namespace}:hits',
+        f'store:stats:{namespace}:misses',
+    ])
+
+
+class CachedResponseMixin:
+    """
+    Cache the serialized data of list and retrieve responses.
+
+    Entries are keyed on the action, the URL kwargs (e.g. `collection_pk`)
+    and the normalized query string, and live under the namespace version,
+    so bumping the version drops them all at once.
+    """
+    cache_namespace = CATALOG
+    cache_timeout = None
+
+    def get_cache_timeout(self):
+        if self.cache_timeout is not None:
+            return self.cache_timeout
+        return getattr(settings, 'STORE_RESPONSE_CACHE_TIMEOUT', 300)
+
+    def get_response_cache_key(self, request):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        )
+        kwargs = sorted(self.kwargs.items())
+        raw = repr((request.scheme, request.get_host(), kwargs, params))
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        version = get_version(self.cache_namespace)
+        return f'store:response:{self.basename}:{self.action}:{version}:{digest}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            _incr_counter(f'{self.cache_namespace}:hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _incr_counter(f'{self.cache_namespace}:misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.get_cache_timeout())
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,466 @@
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from functools import reduce
+from operator import or_
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, NotFound
+from .models import Cart, CartItem, InventoryHold, Product
+from . import inventory
+
+
+DEFAULTS = {
+    # 'database' serves carts straight from Cart/CartItem, 'cache' keeps the
+    # live state in the cache and flushes it with `manage.py flush_carts`.
+    'ENGINE': 'database',
+    'CACHE_ALIAS': 'default',
+    # Seconds an untouched cart stays in the cache; must be well above the
+    # flush interval or unflushed changes can expire.
+    'TIMEOUT': 7 * 24 * 60 * 60,
+    # Persist every change immediately (reads still come from the cache).
+    'WRITE_THROUGH': False,
+    # Upper bound on flush lag when flush_carts runs with --loop.
+    'FLUSH_INTERVAL': 30,
+    'FLUSH_BATCH_SIZE': 500,
+    # Seconds a request waits for another one to finish changing the same
+    # cart, and after which the lock of a crashed request lapses.
+    'LOCK_WAIT': 5,
+    'LOCK_TIMEOUT': 30,
+}
+
+
+def cart_settings():
+    return {**DEFAULTS, **getattr(settings, 'STORE_CART_STORAGE', {})}
+
+
+def is_cached():
+    return cart_settings()['ENGINE'] == 'cache'
+
+
+def touch(cart_id):
+    """Record activity on a database cart so purge_carts keeps it."""
+    Cart.objects.filter(pk=cart_id).update(last_activity=timezone.now())
+
+
+def lock(cart_id):
+    """
+    Lock a database cart's row until the end of the transaction.
+
+    Every writer of a cart takes this lock before the cart's holds, as
+    checkout and merge do, so they cannot deadlock on each other. Raises
+    NotFound when the cart does not exist.
+    """
+    if not Cart.objects.select_for_update().filter(pk=cart_id).exists():
+        raise NotFound('No Cart matches the given query.')
+
+
+def apply_operations(items, operations, inventories):
+    """
+    Apply batch operations to a cart's {product_id: quantity} lines.
+
+    `inventories` maps every product the operations name to its stock.
+    Returns the new lines, or raises ValidationError naming each product
+    that does not exist or would exceed its inventory.
+    """
+    items = dict(items)
+    errors = {}
+    for operation in operations:
+        product_id = operation['product_id']
+        if product_id not in inventories:
+            errors[product_id] = 'Product does not exist'
+        elif operation['op'] == 'add':
+            items[product_id] = items.get(product_id, 0) + operation['quantity']
+        elif operation['op'] == 'set':
+            items[product_id] = operation['quantity']
+        else:
+            items.pop(product_id, None)
+
+    for product_id, quantity in items.items():
+        if product_id in inventories and quantity > inventories[product_id]:
+            errors[product_id] = 'Insufficient inventory'
+
+    if errors:
+        raise serializers.ValidationError({'products': errors})
+    return items
+
+
+# Fold the source cart's lines into the target cart: quantities of a
+# product in both are summed, and every line is capped at inventory.
+MERGE_ITEMS = """
+INSERT INTO store_cartitem (cart_id, product_id, quantity)
+SELECT %(target)s, item.product_id,
+       CASE WHEN item.quantity < product.inventory
+            THEN item.quantity ELSE product.inventory END
+FROM store_cartitem item
+JOIN store_product product ON product.id = item.product_id
+WHERE item.cart_id = %(source)s AND product.inventory > 0
+ON CONFLICT (cart_id, product_id) DO UPDATE SET quantity = (
+    SELECT CASE WHEN store_cartitem.quantity + excluded.quantity < product.inventory
+                THEN store_cartitem.quantity + excluded.quantity
+                ELSE product.inventory END
+    FROM store_product product WHERE product.id = excluded.product_id
+)
+"""
+
+# Move the source cart's holds onto the target, summing them, so the
+# reserved totals of the products do not change; merge() then trims the
+# holds to the merged lines.
+MERGE_HOLDS = """
+INSERT INTO store_inventoryhold (cart_id, product_id, quantity, expires_at)
+SELECT %(target)s, hold.product_id, hold.quantity, %(expires_at)s
+FROM store_inventoryhold hold
+WHERE hold.cart_id = %(source)s
+ON CONFLICT (cart_id, product_id) DO UPDATE SET
+    quantity = store_inventoryhold.quantity + excluded.quantity,
+    expires_at = excluded.expires_at
+"""
+
+
+def merge(target_id, source_id):
+    """
+    Move the lines and holds of the source cart into the target cart and
+    delete the source, with one upsert per table whatever the cart sizes.
+    Held units beyond a merged line, which was capped at inventory or
+    dropped for lack of it, are returned to stock.
+
+    Both cart rows are locked in id order before any hold, as every cart
+    writer does (see lock()). Raises Cart.DoesNotExist unless both carts
+    exist in the database.
+    """
+    connection = connections[Cart.objects.db]
+    params = {
+        'target': Cart._meta.pk.get_db_prep_value(target_id, connection),
+        'source': Cart._meta.pk.get_db_prep_value(source_id, connection),
+        'expires_at': InventoryHold._meta.get_field('expires_at').get_db_prep_value(
+            timezone.now() + inventory.hold_ttl(), connection),
+    }
+    with transaction.atomic():
+        locked = Cart.objects \
+            .select_for_update() \
+            .filter(pk__in=[target_id, source_id]) \
+            .order_by('pk') \
+            .values_list('pk', flat=True)
+        if len(locked) != 2:
+            raise Cart.DoesNotExist
+        # Then their holds, in product order as store.inventory takes them
+        list(InventoryHold.objects
+             .select_for_update()
+             .filter(cart_id__in=[target_id, source_id])
+             .order_by('product_id', 'cart_id')
+             .values_list('id'))
+        with connection.cursor() as cursor:
+            cursor.execute(MERGE_ITEMS, params)
+            cursor.execute(MERGE_HOLDS, params)
+        lines = dict(CartItem.objects.filter(cart_id=target_id).values_list('product_id', 'quantity'))
+        excess = {
+            hold.product_id: hold
+            for hold in InventoryHold.objects.filter(cart_id=target_id)
+            if hold.quantity > lines.get(hold.product_id, 0)
+        }
+        inventory.set_holds(excess, {product_id: lines.get(product_id, 0) for product_id in excess})
+        InventoryHold.objects.filter(cart_id=source_id).delete()
+        Cart.objects.filter(pk=source_id).delete()
+        touch(target_id)
+
+
+class CartBusy(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The cart is being changed by another request, please retry.'
+    default_code = 'cart_busy'
+
+
+class CacheCartStore:
+    """
+    Cart state kept in the Django cache with write-behind persistence.
+
+    A cart is stored under one key as {'created_at', 'items': {product_id:
+    quantity}}; a deleted cart leaves a tombstone until it is flushed.
+    Every write appends the cart id to a journal numbered by cache.incr(),
+    and flush() persists the carts named in the journal since the last
+    flushed position. Carts missing from the cache are read through from
+    the database. Items are addressed by product id.
+
+    Writers hold a per-cart lock, taken with cache.add(), and re-read the
+    cart under it, so concurrent changes to one cart are applied one after
+    the other instead of overwriting each other.
+    """
+    SEQUENCE_KEY = 'store:cart:journal'
+    FLUSHED_KEY = 'store:cart:journal:flushed'
+
+    def __init__(self):
+        conf = cart_settings()
+        self.cache = caches[conf['CACHE_ALIAS']]
+        self.timeout = conf['TIMEOUT']
+        self.write_through = conf['WRITE_THROUGH']
+        self.batch_size = conf['FLUSH_BATCH_SIZE']
+        self.lock_wait = conf['LOCK_WAIT']
+        self.lock_timeout = conf['LOCK_TIMEOUT']
+        self._locked = set()
+
+    @staticmethod
+    def _key(cart_id):
+        return f'store:cart:{cart_id}'
+
+    @staticmethod
+    def _lock_key(cart_id):
+        return f'store:cart:{cart_id}:lock'
+
+    @staticmethod
+    def _journal_key(position):
+        return f'store:cart:journal:{position}'
+
+    @staticmethod
+    def _parse_id(cart_id):
+        try:
+            return str(uuid.UUID(str(cart_id)))
+        except ValueError:
+            return None
+
+    # Reads
+
+    def load(self, cart_id):
+        cart_id = self._parse_id(cart_id)
+        if cart_id is None:
+            return None
+        state = self.cache.get(self._key(cart_id))
+        if state is None:
+            state = self._load_from_database(cart_id)
+            if state is None:
+                return None
+            self.cache.add(self._key(cart_id), state, self.timeout)
+        if state.get('deleted'):
+            return None
+        return state
+
+    def _load_from_database(self, cart_id):
+        cart = Cart.objects.filter(pk=cart_id).first()
+        if cart is None:
+            return None
+        return {
+            'id': cart_id,
+            'created_at': cart.created_at,
+            'last_activity': cart.last_activity,
+            'items': dict(cart.items.values_list('product_id', 'quantity')),
+        }
+
+    def to_instance(self, state):
+        """Build an unsaved Cart whose `items` are prefetched from the state."""
+        cart = Cart(id=uuid.UUID(state['id']), created_at=state['created_at'])
+        products = Product.objects.in_bulk(list(state['items']))
+        items = [
+            CartItem(id=product_id, cart=cart, product=products[product_id], quantity=quantity)
+            for product_id, quantity in state['items'].items()
+            if product_id in products
+        ]
+        queryset = CartItem.objects.none()
+        queryset._result_cache = items
+        queryset._prefetch_done = True
+        cart._prefetched_objects_cache = {'items': queryset}
+        return cart
+
+    # Writes
+
+    @contextmanager
+    def lock(self, cart_id):
+        """
+        Hold the cart's lock for the block, raising CartBusy when another
+        request keeps it longer than LOCK_WAIT. Re-entrant within a store.
+        """
+        key = self._lock_key(cart_id)
+        if key in self._locked:
+            yield
+            return
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+        while not self.cache.add(key, token, self.lock_timeout):
+            if time.monotonic() > deadline:
+                raise CartBusy()
+            time.sleep(0.01)
+        self._locked.add(key)
+        try:
+            yield
+        finally:
+            self._locked.discard(key)
+            # Not atomic, but only a lock that lapsed during this block
+            # can be someone else's by now
+            if self.cache.get(key) == token:
+                self.cache.delete(key)
+
+    @contextmanager
+    def _editing(self, state):
+        """Lock the cart, refresh `state` from the cache and save it after the block."""
+        with self.lock(state['id']):
+            current = self.load(state['id'])
+            if current is None:
+                raise NotFound('No Cart matches the given query.')
+            state.clear()
+            state.update(current)
+            yield state
+            self.save(state)
+
+    def save(self, state):
+        state['last_activity'] = timezone.now()
+        self.cache.set(self._key(state['id']), state, self.timeout)
+        self._mark_dirty(state['id'])
+        if self.write_through:
+            self.persist([state['id']])
+
+    def _mark_dirty(self, cart_id):
+        self.cache.add(self.SEQUENCE_KEY, 0, None)
+        position = self.cache.incr(self.SEQUENCE_KEY)
+        self.cache.set(self._journal_key(position), cart_id, None)
+
+    def create(self):
+        state = {
+            'id': str(uuid.uuid4()),
+            'created_at': timezone.now(),
+            'items': {},
+        }
+        self.save(state)
+        return state
+
+    def delete(self, cart_id):
+        cart_id = self._parse_id(cart_id)
+        with self.lock(cart_id):
+            inventory.release(cart_id)
+            self.save({'id': cart_id, 'deleted': True})
+
+    def clear(self, state):
+        with self._editing(state):
+            inventory.release(state['id'])
+            state['items'] = {}
+
+    def _hold(self, state, product_id, quantity):
+        if not Product.objects.filter(pk=product_id).exists():
+            raise serializers.ValidationError('Product does not exist')
+        try:
+            inventory.hold(state['id'], {product_id: quantity})
+        except serializers.ValidationError:
+            raise serializers.ValidationError('Insufficient inventory')
+
+    def add_item(self, state, product_id, quantity):
+        with self._editing(state):
+            quantity += state['items'].get(product_id, 0)
+            self._hold(state, product_id, quantity)
+            state['items'][product_id] = quantity
+        return quantity
+
+    def set_item(self, state, product_id, quantity):
+        with self._editing(state):
+            self._hold(state, product_id, quantity)
+            state['items'][product_id] = quantity
+
+    def remove_item(self, state, product_id):
+        with self._editing(state):
+            inventory.hold(state['id'], {product_id: 0})
+            state['items'].pop(product_id, None)
+
+    def apply_batch(self, state, operations):
+        product_ids = {operation['product_id'] for operation in operations}
+        inventories = dict(
+            Product.objects.filter(id__in=product_ids).values_list('id', 'inventory'))
+        with self._editing(state):
+            items = apply_operations(state['items'], operations, inventories)
+            inventory.hold(state['id'], {
+                product_id: items.get(product_id, 0) for product_id in product_ids
+            })
+            state['items'] = items
+
+    def merge(self, state, source):
+        """Merge the source cart's state into `state` through the database."""
+        with ExitStack() as stack:
+            # Both carts, locked in one order so opposite merges cannot
+            # wait on each other
+            for cart_id in sorted([state['id'], source['id']]):
+                stack.enter_context(self.lock(cart_id))
+            if self.load(source['id']) is None:
+                raise NotFound('No Cart matches the given query.')
+            with self._editing(state):
+                self.persist([state['id'], source['id']])
+                merge(state['id'], source['id'])
+                state.update(self._load_from_database(state['id']))
+            self.save({'id': source['id'], 'deleted': True})
+
+    # Persistence
+
+    def flush(self):
+        """
+        Persist every cart written since the last flush.
+
+        Returns the number of carts written to the database.
+        """
+        self.cache.add(self.SEQUENCE_KEY, 0, None)
+        self.cache.add(self.FLUSHED_KEY, 0, None)
+        sequence = self.cache.get(self.SEQUENCE_KEY)
+        flushed = self.cache.get(self.FLUSHED_KEY)
+        persisted = 0
+
+        while flushed < sequence:
+            upto = min(sequence, flushed + self.batch_size)
+            keys = [self._journal_key(position) for position in range(flushed + 1, upto + 1)]
+            entries = self.cache.get_many(keys)
+            missing = [key for key in keys if key not in entries]
+            if missing:
+                # A writer may sit between incr() and set(); give it a moment
+                # before treating the entry as evicted.
+                time.sleep(0.5)
+                entries.update(self.cache.get_many(missing))
+
+            persisted += self.persist(set(entries.values()))
+            self.cache.set(self.FLUSHED_KEY, upto, None)
+            self.cache.delete_many(keys)
+            flushed = upto
+
+        return persisted
+
+    def persist(self, cart_ids):
+        """Write the cached state of the given carts to Cart/CartItem."""
+        states = self.cache.get_many([self._key(cart_id) for cart_id in cart_ids])
+        deleted = [state['id'] for state in states.values() if state.get('deleted')]
+        live = [state for state in states.values() if not state.get('deleted')]
+
+        product_ids = {product_id for state in live for product_id in state['items']}
+        existing = set(
+            Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+
+        carts = [
+            Cart(id=state['id'], created_at=state['created_at'],
+                 last_activity=state.get('last_activity', state['created_at']))
+            for state in live
+        ]
+        items = [
+            CartItem(cart_id=state['id'], product_id=product_id, quantity=quantity)
+            for state in live
+            for product_id, quantity in state['items'].items()
+            if product_id in existing
+        ]
+        stale = [
+            Q(cart_id=state['id']) & ~Q(product_id__in=list(state['items']))
+            for state in live
+        ]
+
+        with transaction.atomic():
+            if deleted:
+                Cart.objects.filter(id__in=deleted).delete()
+            if carts:
+                Cart.objects.bulk_create(carts, ignore_conflicts=True)
+                # bulk_create stamps created_at with the flush time, on the
+                # rows and on the instances, so restore it from the state
+                for cart, state in zip(carts, live):
+                    cart.created_at = state['created_at']
+                Cart.objects.bulk_update(carts, ['created_at', 'last_activity'])
+                CartItem.objects.filter(reduce(or_, stale)).delete()
+            if items:
+                CartItem.objects.bulk_create(
+                    items,
+                    update_conflicts=True,
+                    unique_fields=['cart', 'product'],
+                    update_fields=['quantity'],
+                )
+
+        return len(states)
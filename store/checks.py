@@ -0,0 +1,31 @@
+from django.core.cache import caches
+from django.core.checks import Error, Tags, Warning, register
+from .caching import get_cache, is_process_local
+from .carts import cart_settings
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if not is_process_local(get_cache()):
+        return []
+    return [Warning(
+        'The store cache is local to each process.',
+        hint='Catalog version bumps and cache_stats counters are not seen by '
+             'other web workers or management commands; point CACHES (or '
+             'STORE_CACHE_ALIAS) at a shared cache such as Redis.',
+        id='store.W001',
+    )]
+
+
+@register(Tags.caches)
+def check_cart_cache(app_configs, **kwargs):
+    conf = cart_settings()
+    if conf['ENGINE'] != 'cache' or not is_process_local(caches[conf['CACHE_ALIAS']]):
+        return []
+    return [Error(
+        "STORE_CART_STORAGE['ENGINE'] is 'cache' but its cache is local to each process.",
+        hint='Every web worker would keep its own carts, their locks and their '
+             'journal, which flush_carts never sees; set '
+             "STORE_CART_STORAGE['CACHE_ALIAS'] to a shared cache such as Redis.",
+        id='store.E001',
+    )]
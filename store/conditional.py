@@ -0,0 +1,81 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .caching import get_version
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validators for list and retrieve.
+
+    Validators are computed with one cheap query before anything is
+    serialized, and a matching If-None-Match or If-Modified-Since gets a
+    304 straight away:
+
+    - with `last_modified_field`, a detail uses that row's timestamp and a
+      list an ETag of max(timestamp) and count(*) of the filtered queryset;
+    - otherwise the version counter of `etag_namespace` is used, which must
+      be bumped whenever a row of the representation changes.
+    """
+    last_modified_field = None
+    etag_namespace = None
+
+    def _etag(self, request, *parts):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        )
+        raw = repr((
+            self.action, sorted(self.kwargs.items()), params,
+            request.accepted_renderer.format, parts))
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def get_list_validators(self, request, queryset):
+        if self.last_modified_field is None:
+            return self._etag(request, get_version(self.etag_namespace)), None
+        fingerprint = queryset.order_by().aggregate(
+            last_modified=Max(self.last_modified_field), count=Count('pk'))
+        etag = self._etag(request, fingerprint['last_modified'], fingerprint['count'])
+        # No Last-Modified: a deletion lowers the count but not the max
+        return etag, None
+
+    def get_detail_validators(self, request):
+        if self.last_modified_field is None:
+            return self._etag(request, get_version(self.etag_namespace)), None
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = self.get_queryset() \
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}) \
+            .values_list(self.last_modified_field, flat=True) \
+            .first()
+        if last_modified is None:
+            # Missing row, let retrieve() answer with its 404
+            return None, None
+        return self._etag(request, last_modified), last_modified
+
+    def conditional_response(self, handler, request, etag, last_modified, *args, **kwargs):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        if etag is not None:
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp)
+            if response is not None:
+                return response
+
+        response = handler(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.get_list_validators(request, queryset)
+        return self.conditional_response(
+            super().list, request, etag, last_modified, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.get_detail_validators(request)
+        return self.conditional_response(
+            super().retrieve, request, etag, last_modified, *args, **kwargs)
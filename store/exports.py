@@ -0,0 +1,115 @@
+import csv
+from itertools import islice
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from tags.models import TaggedItem
+from .models import Product, ReviewSummary
+
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+FIELDS = [
+    'id', 'title', 'slug', 'description', 'unit_price', 'inventory',
+    'last_update', 'collection', 'promotions', 'reviews_count',
+    'average_rating', 'tags',
+]
+
+
+class Echo:
+    """File-like object whose write() hands the value back to csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(queryset=None):
+    if queryset is None:
+        queryset = Product.objects.all()
+    return queryset \
+        .select_related('collection', 'review_summary') \
+        .prefetch_related('promotions') \
+        .order_by('id')
+
+
+def _tags(ids):
+    tags = {}
+    content_type = ContentType.objects.get_for_model(Product)
+    for object_id, label in TaggedItem.objects \
+            .filter(content_type=content_type, object_id__in=ids) \
+            .values_list('object_id', 'tag__label'):
+        tags.setdefault(object_id, []).append(label)
+    return tags
+
+
+def iter_products(queryset=None, chunk_size=2000):
+    """
+    Yield one dict per product, a chunk at a time.
+
+    The queryset is read through a server-side cursor and promotions are
+    prefetched per chunk by iterator(); tags add one query per chunk, so
+    memory depends on chunk_size only.
+    """
+    rows = export_queryset(queryset).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [product.id for product in chunk]
+        tags = _tags(ids)
+        for product in chunk:
+            summary = getattr(product, 'review_summary', None) or ReviewSummary()
+            yield {
+                'id': product.id,
+                'title': product.title,
+                'slug': product.slug,
+                'description': product.description,
+                'unit_price': product.unit_price,
+                'inventory': product.inventory,
+                'last_update': product.last_update,
+                'collection': product.collection.title,
+                'promotions': [
+                    promotion.description for promotion in product.promotions.all()
+                ],
+                'reviews_count': summary.count,
+                'average_rating': summary.average,
+                'tags': tags.get(product.id, []),
+            }
+
+
+def stream_ndjson(products, rows_per_write=500):
+    encoder = DjangoJSONEncoder()
+    buffer = []
+    for product in products:
+        buffer.append(encoder.encode(product))
+        if len(buffer) >= rows_per_write:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+def stream_csv(products, rows_per_write=500):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    buffer = []
+    for product in products:
+        row = dict(product)
+        row['promotions'] = '|'.join(row['promotions'])
+        row['tags'] = '|'.join(row['tags'])
+        row['last_update'] = row['last_update'].isoformat()
+        buffer.append(writer.writerow([row[field] for field in FIELDS]))
+        if len(buffer) >= rows_per_write:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_products(format, queryset=None, chunk_size=2000):
+    products = iter_products(queryset, chunk_size=chunk_size)
+    if format == 'csv':
+        return stream_csv(products)
+    return stream_ndjson(products)
@@ -0,0 +1,51 @@
+from datetime import timedelta
+from django.utils import timezone
+from django_filters import rest_framework as filters
+from .models import Cart, DailySales
+
+
+class CartFilter(filters.FilterSet):
+    """
+    Age in days since the cart was created; value is the subtotal before
+    promotions, as summed up by Cart.objects.with_totals().
+    """
+    min_age = filters.NumberFilter(method='filter_min_age', min_value=0)
+    max_age = filters.NumberFilter(method='filter_max_age', min_value=0)
+    min_value = filters.NumberFilter(method='filter_min_value', min_value=0)
+    max_value = filters.NumberFilter(method='filter_max_value', min_value=0)
+
+    class Meta:
+        model = Cart
+        fields = []
+
+    @staticmethod
+    def _days_ago(days):
+        return timezone.now() - timedelta(days=float(days))
+
+    @staticmethod
+    def _with_totals(queryset):
+        if 'subtotal' in queryset.query.annotations:
+            return queryset
+        return queryset.with_totals()
+
+    def filter_min_age(self, queryset, name, value):
+        return queryset.filter(created_at__lte=self._days_ago(value))
+
+    def filter_max_age(self, queryset, name, value):
+        return queryset.filter(created_at__gte=self._days_ago(value))
+
+    def filter_min_value(self, queryset, name, value):
+        return self._with_totals(queryset).filter(subtotal__gte=value)
+
+    def filter_max_value(self, queryset, name, value):
+        return self._with_totals(queryset).filter(subtotal__lte=value)
+
+
+class SalesFilter(filters.FilterSet):
+    """Days from start to end, both included."""
+    start = filters.DateFilter(field_name='day', lookup_expr='gte')
+    end = filters.DateFilter(field_name='day', lookup_expr='lte')
+
+    class Meta:
+        model = DailySales
+        fields = ['collection', 'product']
@@ -0,0 +1,164 @@
+import codecs
+import csv
+import json
+import time
+from itertools import islice
+from django.db import transaction
+from rest_framework import serializers
+from .caching import CATALOG, bump_version
+from .models import Collection, Product
+
+
+FORMATS = ['csv', 'ndjson']
+
+
+class ProductRowSerializer(serializers.Serializer):
+    """One product of a supplier feed; `collection` is the collection title."""
+    title = serializers.CharField(max_length=255)
+    slug = serializers.SlugField(max_length=50)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    unit_price = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=1)
+    inventory = serializers.IntegerField(min_value=0)
+    collection = serializers.CharField(max_length=255)
+
+
+class RowError(Exception):
+    pass
+
+
+def detect_format(filename, default=None):
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension == 'csv':
+            return 'csv'
+        if extension in ('ndjson', 'jsonl'):
+            return 'ndjson'
+    return default
+
+
+def read_rows(lines, format):
+    """
+    Lazily parse an iterable of text lines into row dicts.
+
+    Lines that cannot be parsed are yielded as RowError instances so the
+    importer can reject them without stopping the stream.
+    """
+    if format == 'csv':
+        yield from csv.DictReader(lines)
+    elif format == 'ndjson':
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield RowError(f'Invalid JSON: {e}')
+                continue
+            yield row if isinstance(row, dict) else RowError('Expected a JSON object')
+    else:
+        raise ValueError(f'Unsupported format: {format}')
+
+
+def decode_lines(binary_lines, encoding='utf-8-sig'):
+    return codecs.iterdecode(binary_lines, encoding)
+
+
+class ProductImporter:
+    """
+    Upsert products by slug from a stream of rows.
+
+    Rows are validated and written `batch_size` at a time, with one
+    collection lookup and one INSERT ... ON CONFLICT per batch, so memory
+    use depends on the batch size and not on the size of the feed.
+    """
+
+    def __init__(self, batch_size=1000, max_errors=100):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.rows = 0
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+        self.seconds = 0
+
+    def run(self, rows):
+        start = time.perf_counter()
+        numbered = enumerate(rows, start=1)
+        while True:
+            batch = list(islice(numbered, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+        self.seconds = time.perf_counter() - start
+        return self.report()
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': line, 'errors': errors})
+
+    def import_batch(self, batch):
+        self.rows += len(batch)
+
+        valid = []
+        for line, row in batch:
+            if isinstance(row, RowError):
+                self.reject(line, [str(row)])
+                continue
+            serializer = ProductRowSerializer(data=row)
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                self.reject(line, serializer.errors)
+
+        titles = {data['collection'] for _, data in valid}
+        collections = dict(
+            Collection.objects.filter(title__in=titles).values_list('title', 'id'))
+
+        # A statement may not upsert the same slug twice; the last row wins.
+        products = {}
+        for line, data in valid:
+            collection_id = collections.get(data['collection'])
+            if collection_id is None:
+                self.reject(line, {'collection': [f'Collection "{data["collection"]}" does not exist']})
+                continue
+            products[data['slug']] = Product(
+                title=data['title'],
+                slug=data['slug'],
+                description=data.get('description'),
+                unit_price=data['unit_price'],
+                inventory=data['inventory'],
+                collection_id=collection_id,
+            )
+
+        if not products:
+            return
+
+        # Collections that gain or lose products through the upsert
+        collection_ids = {product.collection_id for product in products.values()}
+        with transaction.atomic():
+            collection_ids.update(
+                Product.objects
+                .filter(slug__in=products.keys())
+                .values_list('collection_id', flat=True))
+            Product.objects.bulk_create(
+                products.values(),
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=['title', 'description', 'unit_price',
+                               'inventory', 'collection', 'last_update'],
+            )
+            Collection.objects.filter(id__in=collection_ids).recount_products()
+        self.imported += len(products)
+        # bulk_create does not send post_save, so this is done by hand
+        bump_version(CATALOG)
+
+    def report(self):
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows / self.seconds) if self.seconds else None,
+        }
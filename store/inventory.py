@@ -0,0 +1,175 @@
+"""
+Stock reservations for carts.
+
+A cart line is backed by an InventoryHold of the same quantity that
+expires STORE_INVENTORY_HOLD_TTL seconds after the line last changed.
+ProductStock.reserved is the sum of a product's holds and is moved with
+one conditional UPDATE per change, so available stock is
+`inventory - reserved` without reading the product row, and concurrent
+adders of a hot product only queue on that one short statement.
+
+Locks are always taken holds first, then stock rows in product order,
+by carts and by the sweeper alike, so they cannot deadlock. Writers of a
+database cart lock its row before its holds (see store.carts.lock).
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+from .models import InventoryHold, Product, ProductStock
+
+
+def hold_ttl():
+    return timedelta(seconds=getattr(settings, 'STORE_INVENTORY_HOLD_TTL', 15 * 60))
+
+
+def reserve(product_id, delta):
+    """
+    Move the product's reserved units by `delta`.
+
+    Returns False, changing nothing, when `delta` is positive and fewer
+    than `delta` units are available.
+    """
+    stock = ProductStock.objects.filter(product_id=product_id)
+    if delta > 0:
+        inventory = Product.objects.filter(pk=product_id).values('inventory')
+        stock = stock.filter(reserved__lte=Subquery(inventory) - delta)
+    if stock.update(reserved=F('reserved') + delta):
+        return True
+    if delta < 0 or ProductStock.objects.filter(product_id=product_id).exists():
+        return False
+    # First reservation of this product
+    ProductStock.objects.bulk_create([ProductStock(product_id=product_id)], ignore_conflicts=True)
+    return reserve(product_id, delta)
+
+
+def lock_holds(cart_id, product_ids):
+    """
+    Lock the cart's holds on the given products, creating empty ones.
+
+    Returns {product_id: InventoryHold}. Call inside a transaction.
+    """
+    product_ids = sorted(set(product_ids))
+    expires_at = timezone.now() + hold_ttl()
+    holds = {}
+    while len(holds) < len(product_ids):
+        InventoryHold.objects.bulk_create(
+            [
+                InventoryHold(cart_id=cart_id, product_id=product_id,
+                              quantity=0, expires_at=expires_at)
+                for product_id in product_ids
+                if product_id not in holds
+            ],
+            ignore_conflicts=True)
+        # A hold swept between the insert and the lock comes back missing
+        # and is inserted again on the next pass.
+        holds.update({
+            hold.product_id: hold
+            for hold in InventoryHold.objects
+                .select_for_update()
+                .filter(cart_id=cart_id, product_id__in=product_ids)
+                .exclude(product_id__in=list(holds))
+                .order_by('product_id')
+        })
+    return holds
+
+
+def set_holds(holds, quantities):
+    """
+    Resize locked holds to {product_id: quantity}, reserving or releasing
+    the difference; a quantity of 0 drops the hold.
+
+    Raises ValidationError naming every product that is short of stock.
+    Call in the transaction that locked the holds and roll it back on error.
+    """
+    expires_at = timezone.now() + hold_ttl()
+    errors = {}
+    for product_id in sorted(quantities):
+        hold = holds[product_id]
+        quantity = quantities[product_id]
+        delta = quantity - hold.quantity
+        if delta and not reserve(product_id, delta):
+            errors[product_id] = 'Insufficient inventory'
+            continue
+        hold.quantity = quantity
+        hold.expires_at = expires_at
+
+    if errors:
+        raise serializers.ValidationError({'products': errors})
+
+    InventoryHold.objects \
+        .filter(id__in=[hold.id for hold in holds.values() if not hold.quantity]) \
+        .delete()
+    InventoryHold.objects.bulk_update(
+        [hold for hold in holds.values() if hold.quantity], ['quantity', 'expires_at'])
+
+
+def hold(cart_id, quantities):
+    """Set the cart's holds to {product_id: quantity} in one transaction."""
+    with transaction.atomic():
+        set_holds(lock_holds(cart_id, list(quantities)), quantities)
+
+
+def release(cart_id):
+    """Drop every hold of the cart and return its units to stock."""
+    with transaction.atomic():
+        holds = list(InventoryHold.objects
+                     .select_for_update()
+                     .filter(cart_id=cart_id)
+                     .order_by('product_id'))
+        _release(holds)
+
+
+def _release(holds):
+    totals = {}
+    for hold in holds:
+        totals[hold.product_id] = totals.get(hold.product_id, 0) + hold.quantity
+    totals = {product_id: total for product_id, total in totals.items() if total}
+    InventoryHold.objects.filter(id__in=[hold.id for hold in holds]).delete()
+    if not totals:
+        return
+    # Lock in product order, then return every product's units in one UPDATE
+    list(ProductStock.objects
+         .select_for_update()
+         .filter(product_id__in=totals)
+         .order_by('product_id')
+         .values_list('product_id'))
+    ProductStock.objects.filter(product_id__in=totals).update(reserved=F('reserved') - Case(
+        *[When(product_id=product_id, then=Value(total)) for product_id, total in totals.items()],
+        output_field=IntegerField(),
+    ))
+
+
+def sweep(batch_size=1000):
+    """
+    Release one batch of expired holds, oldest first.
+
+    Holds locked by a cart that is changing them are skipped; the cart
+    renews them anyway. Returns the number of holds released.
+    """
+    with transaction.atomic():
+        holds = list(InventoryHold.objects
+                     .select_for_update(skip_locked=True)
+                     .filter(expires_at__lte=timezone.now())
+                     .order_by('expires_at')[:batch_size])
+        _release(holds)
+    return len(holds)
+
+
+def rebuild():
+    """Recompute every ProductStock.reserved from the holds."""
+    totals = InventoryHold.objects \
+        .filter(product=OuterRef('product')) \
+        .order_by() \
+        .values('product') \
+        .annotate(total=Sum('quantity')) \
+        .values('total')
+    with transaction.atomic():
+        ProductStock.objects.bulk_create(
+            [ProductStock(product_id=product_id) for product_id in
+             InventoryHold.objects.values_list('product_id', flat=True).distinct()],
+            ignore_conflicts=True)
+        return ProductStock.objects.update(reserved=Coalesce(Subquery(totals), 0))
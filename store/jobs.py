@@ -0,0 +1,152 @@
+"""
+Bulk admin actions run outside the request.
+
+An action registered with @register gets a queryset of at most
+STORE_ADMIN_JOB_CHUNK_SIZE rows, plus the job's params as keyword
+arguments, and returns how many rows it changed. enqueue() snapshots the
+ids of the selected rows into the chunks of an AdminJob, and
+`manage.py run_admin_jobs` runs the chunks one transaction each, so row
+locks are held one chunk at a time and an error only fails its chunk.
+Workers claim chunks with SKIP LOCKED and can run side by side.
+
+Ids are snapshotted, so rows added after the job was queued are left
+alone and deleted ones are skipped.
+"""
+from decimal import Decimal
+from typing import Callable, NamedTuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Greatest, Least, Round
+from django.utils import timezone
+from .caching import CATALOG, bump_version
+from .models import AdminJob, AdminJobChunk, Product
+
+
+class Action(NamedTuple):
+    name: str
+    model: type
+    function: Callable
+    description: str
+
+
+_actions = {}
+
+
+def register(name, model, description):
+    def decorator(function):
+        _actions[name] = Action(name, model, function, description)
+        return function
+    return decorator
+
+
+def chunk_size():
+    return getattr(settings, 'STORE_ADMIN_JOB_CHUNK_SIZE', 1000)
+
+
+def enqueue(name, queryset, params=None, user=None, description=None):
+    """Queue the action over the rows of the queryset and return its AdminJob."""
+    action = _actions[name]
+    size = chunk_size()
+    with transaction.atomic():
+        job = AdminJob.objects.create(
+            action=name, description=description or action.description,
+            params=params or {}, user=user)
+        chunks = []
+        ids = []
+        for pk in queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=size):
+            ids.append(pk)
+            job.total += 1
+            if len(ids) == size:
+                chunks.append(AdminJobChunk(job=job, ids=ids))
+                ids = []
+            if len(chunks) == 100:
+                AdminJobChunk.objects.bulk_create(chunks)
+                chunks = []
+        if ids:
+            chunks.append(AdminJobChunk(job=job, ids=ids))
+        AdminJobChunk.objects.bulk_create(chunks)
+        if not job.total:
+            job.status = AdminJob.STATUS_DONE
+            job.finished_at = timezone.now()
+        job.save(update_fields=['total', 'status', 'finished_at'])
+    return job
+
+
+def run_next():
+    """
+    Run the oldest pending chunk and return its job, or None when no
+    chunk is waiting.
+    """
+    with transaction.atomic():
+        chunk = AdminJobChunk.objects \
+            .select_for_update(skip_locked=True) \
+            .filter(status=AdminJobChunk.STATUS_PENDING) \
+            .order_by('id') \
+            .first()
+        if chunk is None:
+            return None
+        name, params = AdminJob.objects.values_list('action', 'params').get(pk=chunk.job_id)
+        try:
+            # A savepoint, so a failing action leaves nothing behind but
+            # the chunk is still marked below
+            with transaction.atomic():
+                chunk.changed = _run(chunk.ids, name, params)
+        except Exception as error:
+            chunk.status = AdminJobChunk.STATUS_FAILED
+            chunk.error = f'{type(error).__name__}: {error}'
+        else:
+            chunk.status = AdminJobChunk.STATUS_DONE
+        chunk.save(update_fields=['status', 'changed', 'error'])
+        return _record(chunk)
+
+
+def _run(ids, name, params):
+    if name not in _actions:
+        raise LookupError(f'No admin job action named {name!r}')
+    action = _actions[name]
+    return action.function(action.model._default_manager.filter(pk__in=ids), **params)
+
+
+def _record(chunk):
+    # Workers finishing chunks of the same job take turns here, so the
+    # last one sees every other chunk counted and closes the job.
+    job = AdminJob.objects.select_for_update().get(pk=chunk.job_id)
+    if chunk.status == AdminJobChunk.STATUS_DONE:
+        job.processed += len(chunk.ids)
+        job.changed += chunk.changed
+    else:
+        job.failed += len(chunk.ids)
+    if job.processed + job.failed < job.total:
+        job.status = AdminJob.STATUS_RUNNING
+    else:
+        job.status = AdminJob.STATUS_FAILED if job.failed else AdminJob.STATUS_DONE
+        job.finished_at = timezone.now()
+    job.save(update_fields=['processed', 'failed', 'changed', 'status', 'finished_at'])
+    return job
+
+
+# Product actions. queryset.update() skips Product's signals, so the
+# validators of conditional GETs are moved through last_update and
+# cached catalog responses are dropped by hand.
+
+@register('clear_inventory', Product, 'Clear inventory')
+def clear_inventory(queryset):
+    updated = queryset.update(inventory=0, last_update=timezone.now())
+    bump_version(CATALOG)
+    return updated
+
+
+@register('adjust_prices', Product, 'Adjust prices')
+def adjust_prices(queryset, percent):
+    """Change unit prices by `percent`, rounded to the cent and kept within the field's bounds."""
+    price = DecimalField(max_digits=6, decimal_places=2)
+    adjusted = Round(F('unit_price') * Value(1 + Decimal(percent) / 100), 2)
+    updated = queryset.update(
+        unit_price=Greatest(
+            Least(adjusted, Value(Decimal('9999.99'), price), output_field=price),
+            Value(Decimal('1.00'), price),
+            output_field=price),
+        last_update=timezone.now())
+    bump_version(CATALOG)
+    return updated
@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from rest_framework.exceptions import ValidationError
+from django.db.models import Sum
+from store.models import Cart, CartItem, Collection, InventoryHold, Product, ProductStock
+from store.serializers import CartItemSerializer
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Add the same product to carts from many threads and check that '
+        'no update is lost and inventory is never over-reserved'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Concurrent adders (default: 8)'
+        )
+        parser.add_argument(
+            '--adds',
+            type=int,
+            default=50,
+            help='Adds of one unit per thread (default: 50)'
+        )
+
+    def add_to_cart(self, cart_id, product_id, adds):
+        accepted = rejected = 0
+        try:
+            for _ in range(adds):
+                serializer = CartItemSerializer(
+                    data={'product_id': product_id, 'quantity': 1},
+                    context={'cart_id': cart_id})
+                serializer.is_valid(raise_exception=True)
+                try:
+                    serializer.save()
+                    accepted += 1
+                except ValidationError:
+                    rejected += 1
+        finally:
+            connections.close_all()
+        return accepted, rejected
+
+    def run(self, label, inventory, threads, adds, shared_cart):
+        collection = Collection.objects.create(title='Benchmark')
+        product = Product.objects.create(
+            title='Benchmark product', slug=f'bench-cart-adds-{time.time_ns()}',
+            unit_price=1, inventory=inventory, collection=collection)
+        if shared_cart:
+            carts = [Cart.objects.create()] * threads
+        else:
+            # A flash sale: every adder has a cart of its own
+            carts = [Cart.objects.create() for _ in range(threads)]
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                results = list(pool.map(
+                    lambda cart: self.add_to_cart(cart.id, product.id, adds),
+                    carts))
+            elapsed = time.perf_counter() - start
+
+            accepted = sum(result[0] for result in results)
+            rejected = sum(result[1] for result in results)
+            quantity = CartItem.objects \
+                .filter(product=product) \
+                .aggregate(total=Sum('quantity'))['total'] or 0
+            held = InventoryHold.objects \
+                .filter(product=product) \
+                .aggregate(total=Sum('quantity'))['total'] or 0
+            reserved = ProductStock.objects.get(product=product).reserved
+            expected = min(threads * adds, inventory)
+
+            self.stdout.write(
+                f'  {label}: {accepted} accepted, {rejected} rejected, '
+                f'quantity {quantity} (expected {expected}), '
+                f'reserved {reserved}, held {held}, '
+                f'{threads * adds / elapsed:.0f} adds/s'
+            )
+            return quantity == accepted == expected == reserved == held
+        finally:
+            InventoryHold.objects.filter(product=product).delete()
+            Cart.objects.filter(id__in=[cart.id for cart in carts]).delete()
+            product.delete()
+            collection.delete()
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            raise CommandError('SQLite has no row locks; run this against PostgreSQL')
+
+        threads = options['threads']
+        adds = options['adds']
+        total = threads * adds
+
+        ok = self.run('ample inventory', total, threads, adds, shared_cart=True)
+        ok = self.run('scarce inventory', total // 2, threads, adds, shared_cart=True) and ok
+        ok = self.run('flash sale', total // 2, threads, adds, shared_cart=False) and ok
+
+        if not ok:
+            raise CommandError('✗ Lost updates or over-reserved inventory detected')
+        self.stdout.write(self.style.SUCCESS('✓ No lost updates, inventory respected'))
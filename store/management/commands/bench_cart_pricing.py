@@ -0,0 +1,106 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from store.caching import bump_version
+from store.models import Cart, CartItem, Collection, Product, Promotion
+from store.pricing import PROMOTIONS, discounted
+from store.serializers import CartSerializer
+import random
+import time
+
+
+def legacy_price(cart):
+    """Promotions looked up line by line from a per-cart prefetch"""
+    total = Decimal(0)
+    for item in cart.items.all():
+        best = max((promotion.discount for promotion in item.product.promotions.all()), default=0)
+        price = discounted(item.product.unit_price, Decimal(str(best))) if best else item.product.unit_price
+        total += price * item.quantity
+    return total
+
+
+class Command(BaseCommand):
+    help = 'Measure the cost of pricing a large cart with promotions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=100,
+            help='Lines in the cart (default: 100)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of timed runs, the best one is reported (default: 20)'
+        )
+
+    def measure(self, label, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+        self.stdout.write(
+            f'  {label:<28} {min(timings) * 1000:8.2f} ms  {len(queries.captured_queries)} queries')
+        return min(timings)
+
+    def handle(self, *args, **options):
+        lines = options['lines']
+        repeat = options['repeat']
+
+        collection = Collection.objects.create(title='Benchmark')
+        products = Product.objects.bulk_create([
+            Product(title=f'Benchmark product {index}',
+                    slug=f'bench-cart-pricing-{time.time_ns()}-{index}',
+                    unit_price=Decimal(random.randint(100, 99999)) / 100,
+                    inventory=1000, collection=collection)
+            for index in range(lines)
+        ])
+        # bulk_create skips the signals that keep products_count
+        Collection.objects.filter(pk=collection.pk).recount_products()
+        promotions = [
+            Promotion.objects.create(description=f'Benchmark {percent}%', discount=percent / 100)
+            for percent in (5, 10, 25)
+        ]
+        for product in products[::3]:
+            product.promotions.add(*random.sample(promotions, 2))
+        cart = Cart.objects.create()
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=random.randint(1, 5))
+            for product in products
+        ])
+
+        try:
+            def load():
+                return Cart.objects.with_items().get(pk=cart.pk)
+
+            def cold():
+                bump_version(PROMOTIONS)
+                CartSerializer(load()).data
+
+            before = self.measure(
+                'before (per-line lookup)',
+                lambda: legacy_price(
+                    Cart.objects.prefetch_related('items__product__promotions').get(pk=cart.pk)),
+                repeat)
+            self.measure('after, cold promotion table', cold, repeat)
+            after = self.measure('after, warm promotion table', lambda: CartSerializer(load()).data, repeat)
+
+            expected = legacy_price(Cart.objects.prefetch_related('items__product__promotions').get(pk=cart.pk))
+            priced = CartSerializer(load()).data['total_price']
+            self.stdout.write(f'  total {priced} (per-line lookup: {expected})')
+        finally:
+            cart.delete()
+            for promotion in promotions:
+                promotion.delete()
+            Product.objects.filter(id__in=[product.id for product in products]).delete()
+            collection.delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {before / after:.2f}x faster to price a {lines}-line cart, '
+            f'even with serialization counted on the new side only'
+        ))
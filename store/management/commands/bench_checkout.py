@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from store import inventory, orders
+from store.models import Cart, Collection, Customer, Order, OrderItem, Product
+from store.serializers import CartItemBatchSerializer
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Check out carts of a few contended products from many threads and '
+        'check that inventory is never oversold'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Concurrent checkouts (default: 8)'
+        )
+        parser.add_argument(
+            '--carts',
+            type=int,
+            default=400,
+            help='Carts to check out (default: 400)'
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=3,
+            help='Contended products every cart draws its lines from (default: 3)'
+        )
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=2,
+            help='Lines per cart (default: 2)'
+        )
+
+    def fill_cart(self, product_ids, lines):
+        cart = Cart.objects.create()
+        serializer = CartItemBatchSerializer(
+            data={'operations': [
+                {'op': 'add', 'product_id': product_id, 'quantity': 1}
+                for product_id in random.sample(product_ids, lines)
+            ]},
+            context={'cart_id': cart.id})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return cart.id
+
+    def checkout(self, cart_ids, customer_id):
+        placed = rejected = 0
+        try:
+            for cart_id in cart_ids:
+                try:
+                    orders.checkout(cart_id, customer_id)
+                    placed += 1
+                except orders.OutOfStock:
+                    rejected += 1
+        finally:
+            connections.close_all()
+        return placed, rejected
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            raise CommandError('SQLite has no row locks; run this against PostgreSQL')
+
+        threads = options['threads']
+        lines = min(options['lines'], options['products'])
+        # Enough stock for every cart's holds; the holds are then dropped, as
+        # if they had expired, and half of the units the carts want are sold
+        # elsewhere, so that roughly half of the checkouts must be refused
+        stock = options['carts'] * lines
+
+        collection = Collection.objects.create(title='Benchmark')
+        products = [
+            Product.objects.create(
+                title=f'Benchmark product {index}',
+                slug=f'bench-checkout-{time.time_ns()}-{index}',
+                unit_price=1, inventory=stock, collection=collection)
+            for index in range(options['products'])
+        ]
+        product_ids = [product.id for product in products]
+        customer = Customer.objects.create(
+            first_name='Bench', last_name='Checkout',
+            email=f'bench-checkout-{time.time_ns()}@example.com', phone='0')
+
+        try:
+            cart_ids = [self.fill_cart(product_ids, lines) for _ in range(options['carts'])]
+            for cart_id in cart_ids:
+                inventory.release(cart_id)
+            Product.objects.filter(id__in=product_ids).update(inventory=stock // options['products'] // 2)
+            initial = sum(Product.objects.filter(id__in=product_ids).values_list('inventory', flat=True))
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                results = list(pool.map(
+                    lambda index: self.checkout(cart_ids[index::threads], customer.id),
+                    range(threads)))
+            elapsed = time.perf_counter() - start
+
+            placed = sum(result[0] for result in results)
+            rejected = sum(result[1] for result in results)
+            remaining = list(Product.objects.filter(id__in=product_ids).values_list('inventory', flat=True))
+            sold = OrderItem.objects \
+                .filter(product_id__in=product_ids) \
+                .aggregate(total=Sum('quantity'))['total'] or 0
+
+            self.stdout.write(
+                f'  {placed} placed, {rejected} refused, {sold} units sold of {initial}, '
+                f'{sum(remaining)} left, {placed / elapsed:.0f} checkouts/s'
+            )
+            # Nothing placed would pass the other checks without testing them
+            ok = placed > 0 and min(remaining) >= 0 and sold + sum(remaining) == initial \
+                and Order.objects.filter(customer=customer).count() == placed
+        finally:
+            OrderItem.objects.filter(order__customer=customer).delete()
+            Order.objects.filter(customer=customer).delete()
+            Cart.objects.filter(items__product_id__in=product_ids).delete()
+            for product in products:
+                product.delete()
+            collection.delete()
+            customer.delete()
+
+        if not ok:
+            raise CommandError('✗ Oversold inventory, lost orders or no order placed')
+        self.stdout.write(self.style.SUCCESS('✓ Inventory never oversold'))
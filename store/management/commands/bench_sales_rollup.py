@@ -0,0 +1,261 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from store import analytics
+from store.pricing import CENT
+from store.models import Collection, Customer, DailySales, Order, OrderItem, Product, Watermark
+import random
+import time
+
+
+LINES_PER_ORDER = 4
+
+# Numbers 1..n, the only vendor-specific part of the generated data
+SERIES = {
+    'postgresql': 'SELECT i FROM generate_series(1, %s) AS s(i)',
+    'sqlite': 'WITH RECURSIVE s(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM s WHERE i < %s) SELECT i FROM s',
+}
+
+# Order i is placed (i mod days) days and a pseudo-random number of
+# seconds before `now`; seconds are added as a fraction of a day
+PLACED_AT = {
+    'postgresql': "%s::timestamptz - (i %% %s) * interval '1 day' - (i %% 86400 * 7919 %% 86400) * interval '1 second'",
+    'sqlite': "strftime('%%Y-%%m-%%d %%H:%%M:%%f', %s, '-' || (i %% %s) || ' days', "
+              "'-' || (i %% 86400 * 7919 %% 86400) || ' seconds')",
+}
+
+# The stored totals are left at 0, the reports do not read them
+INSERT_ORDERS = '''
+    INSERT INTO store_order (placed_at, updated_at, payment_status, customer_id, total, item_count)
+    SELECT placed_at, placed_at, 'C', %s, 0, 0
+    FROM (SELECT {placed_at} AS placed_at FROM ({series}) AS numbers) AS orders
+'''
+
+# Every order gets LINES_PER_ORDER distinct products of the benchmark
+INSERT_LINES = '''
+    INSERT INTO store_orderitem (order_id, product_id, quantity, unit_price)
+    SELECT o.id, p.id, 1 + (o.id + k.k) %% 5, p.unit_price
+    FROM store_order o
+    CROSS JOIN (SELECT 0 AS k UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3) AS k
+    JOIN (
+        SELECT id, unit_price, ROW_NUMBER() OVER (ORDER BY id) - 1 AS n
+        FROM store_product WHERE collection_id IN ({collections})
+    ) AS p ON p.n = (o.id * 31 + k.k * 97) %% %s
+    WHERE o.customer_id = %s
+'''
+
+
+def line_total():
+    return ExpressionWrapper(
+        F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def cents(rows):
+    # SQLite sums decimals as floats
+    return [(key, total.quantize(CENT)) for key, total in rows]
+
+
+# Tables the benchmark writes, analyzed so both sides get fresh statistics
+ANALYZED_TABLES = ['store_order', 'store_orderitem', 'store_dailysales']
+
+
+class Command(BaseCommand):
+    help = ('Compare sales reports read from the daily rollup with scans of the order lines. '
+            'Writes millions of rows and rebuilds the rollup: run it on a scratch database only.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scratch',
+            action='store_true',
+            help='Confirm that the configured database is a scratch copy the benchmark may write to'
+        )
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=10_000_000,
+            help='Order lines to generate (default: 10000000)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Days the orders are spread over (default: 365)'
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=1000,
+            help='Products the lines are drawn from (default: 1000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed runs, the best one is reported (default: 5)'
+        )
+
+    def measure(self, label, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run()
+            timings.append(time.perf_counter() - start)
+        self.stdout.write(f'  {label:<36} {min(timings) * 1000:10.2f} ms')
+        return min(timings), result
+
+    def generate(self, customer, collections, lines, days, products):
+        placed_at = PLACED_AT[connection.vendor]
+        series = SERIES[connection.vendor]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                INSERT_ORDERS.format(placed_at=placed_at, series=series),
+                [customer.id, timezone.now(), days, lines // LINES_PER_ORDER])
+            cursor.execute(
+                INSERT_LINES.format(collections=', '.join(str(c.id) for c in collections)),
+                [products, customer.id])
+
+    def handle(self, *args, **options):
+        if not options['scratch']:
+            raise CommandError(
+                f'This inserts {options["lines"]} order lines into {connection.settings_dict["NAME"]}, '
+                'rebuilds the whole sales rollup and analyzes its tables; '
+                'pass --scratch to run it on a scratch database.')
+        if connection.vendor not in SERIES:
+            raise CommandError(f'Generating orders is not supported on {connection.vendor}')
+        if options['products'] < 100:
+            raise CommandError('--products must be at least 100')
+        lines, days, repeat = options['lines'], options['days'], options['repeat']
+
+        stamp = time.time_ns()
+        collections = Collection.objects.bulk_create([
+            Collection(title=f'Benchmark {index}') for index in range(10)
+        ])
+        Product.objects.bulk_create([
+            Product(title=f'Benchmark product {index}',
+                    slug=f'bench-sales-rollup-{stamp}-{index}',
+                    unit_price=Decimal(random.randint(100, 99999)) / 100,
+                    inventory=0, collection=collections[index % len(collections)])
+            for index in range(options['products'])
+        ])
+        # bulk_create skips the signals that keep products_count
+        Collection.objects.filter(id__in=[c.id for c in collections]).recount_products()
+        customer = Customer.objects.create(
+            first_name='Benchmark', last_name='Customer', email=f'bench-sales-{stamp}@example.com')
+        orders = Order.objects.filter(customer=customer)
+        watermark = Watermark.objects.filter(name=analytics.SALES).first()
+
+        try:
+            start = time.perf_counter()
+            self.generate(customer, collections, lines, days, options['products'])
+            self.stdout.write(
+                f'  generated {orders.count()} orders, {lines // LINES_PER_ORDER * LINES_PER_ORDER} '
+                f'lines in {time.perf_counter() - start:.1f}s')
+
+            start = time.perf_counter()
+            refreshed, rows = analytics.refresh(full=True)
+            self.stdout.write(
+                f'  full refresh: {refreshed} days, {rows} rollup rows in '
+                f'{time.perf_counter() - start:.1f}s')
+            # Fresh statistics for both sides, as autovacuum would gather
+            with connection.cursor() as cursor:
+                for table in ANALYZED_TABLES:
+                    cursor.execute(f'ANALYZE {table}')
+            # A late line on one old order: the next refresh redoes one day
+            Order.objects.filter(pk=orders.order_by('id').first().pk).update(updated_at=timezone.now())
+            start = time.perf_counter()
+            refreshed, rows = analytics.refresh()
+            self.stdout.write(
+                f'  incremental refresh: {refreshed} day(s), {rows} rollup rows in '
+                f'{(time.perf_counter() - start) * 1000:.0f} ms')
+
+            today = timezone.localdate()
+            month = today - timedelta(days=29)
+            quarter = today - timedelta(days=89)
+            reports = [
+                (
+                    'revenue per day, last 30 days',
+                    lambda: list(OrderItem.objects
+                                 .filter(order__placed_at__gte=analytics.start_of(month))
+                                 .annotate(day=TruncDate('order__placed_at'))
+                                 .order_by()
+                                 .values('day')
+                                 .annotate(revenue=Sum(line_total()))
+                                 .order_by('-day')
+                                 .values_list('day', 'revenue')),
+                    lambda: list(DailySales.objects
+                                 .filter(day__gte=month)
+                                 .order_by()
+                                 .values('day')
+                                 .annotate(revenue=Sum('revenue'))
+                                 .order_by('-day')
+                                 .values_list('day', 'revenue')),
+                ),
+                (
+                    'top 10 products, all time',
+                    lambda: list(OrderItem.objects
+                                 .order_by()
+                                 .values('product_id')
+                                 .annotate(revenue=Sum(line_total()))
+                                 .order_by('-revenue', 'product_id')
+                                 .values_list('product_id', 'revenue')[:10]),
+                    lambda: list(DailySales.objects
+                                 .order_by()
+                                 .values('product_id')
+                                 .annotate(revenue=Sum('revenue'))
+                                 .order_by('-revenue', 'product_id')
+                                 .values_list('product_id', 'revenue')[:10]),
+                ),
+                (
+                    'revenue per collection, 90 days',
+                    lambda: list(OrderItem.objects
+                                 .filter(order__placed_at__gte=analytics.start_of(quarter))
+                                 .order_by()
+                                 .values('product__collection_id')
+                                 .annotate(revenue=Sum(line_total()))
+                                 .order_by('product__collection_id')
+                                 .values_list('product__collection_id', 'revenue')),
+                    lambda: list(DailySales.objects
+                                 .filter(day__gte=quarter)
+                                 .order_by()
+                                 .values('collection_id')
+                                 .annotate(revenue=Sum('revenue'))
+                                 .order_by('collection_id')
+                                 .values_list('collection_id', 'revenue')),
+                ),
+            ]
+
+            ok = True
+            for label, scan, rollup in reports:
+                self.stdout.write(f'{label}:')
+                before, expected = self.measure('scan of the order lines', scan, repeat)
+                after, result = self.measure('daily rollup', rollup, repeat)
+                same = cents(result) == cents(expected)
+                ok = ok and same
+                self.stdout.write(
+                    f'  {before / after:.1f}x faster, '
+                    f'{"same figures" if same else "FIGURES DIFFER"}')
+        finally:
+            days_touched = list(orders.dates('placed_at', 'day'))
+            with transaction.atomic(), connection.cursor() as cursor:
+                # Bypasses the per-line signals, the days are refreshed below
+                cursor.execute(
+                    'DELETE FROM store_orderitem WHERE order_id IN '
+                    '(SELECT id FROM store_order WHERE customer_id = %s)', [customer.id])
+                cursor.execute('DELETE FROM store_order WHERE customer_id = %s', [customer.id])
+            analytics.refresh_days(days_touched)
+            # Leave the next incremental refresh where the benchmark found it
+            if watermark is None:
+                Watermark.objects.filter(name=analytics.SALES).delete()
+            else:
+                watermark.save()
+            customer.delete()
+            Product.objects.filter(collection__in=collections).delete()
+            Collection.objects.filter(id__in=[c.id for c in collections]).delete()
+
+        if not ok:
+            raise CommandError('✗ The rollup disagrees with the order lines')
+        self.stdout.write(self.style.SUCCESS('✓ Rollup reports match the order lines'))
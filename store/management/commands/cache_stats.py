@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from store.caching import CATALOG, cache_stats, get_cache, is_process_local, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counters of the catalog response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them'
+        )
+
+    def handle(self, *args, **options):
+        if is_process_local(get_cache()):
+            raise CommandError(
+                'The store cache is local to each process, so this command cannot '
+                'see the counters of the web workers; configure a shared cache')
+
+        stats = cache_stats(CATALOG)
+        lookups = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / lookups if lookups else 0
+
+        self.stdout.write(
+            f'Catalog cache: {stats["hits"]} hits, {stats["misses"]} misses '
+            f'({ratio:.1%} hit ratio)'
+        )
+
+        if options['reset']:
+            reset_cache_stats(CATALOG)
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from store.carts import CacheCartStore, cart_settings, is_cached
+import time
+
+
+class Command(BaseCommand):
+    help = 'Persist carts held by the cache cart engine to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing every FLUSH_INTERVAL seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Seconds between flushes with --loop (default: FLUSH_INTERVAL)'
+        )
+
+    def handle(self, *args, **options):
+        if not is_cached():
+            raise CommandError("STORE_CART_STORAGE['ENGINE'] is not 'cache', nothing to flush")
+
+        interval = options['interval'] or cart_settings()['FLUSH_INTERVAL']
+        store = CacheCartStore()
+
+        while True:
+            start = time.perf_counter()
+            persisted = store.flush()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Flushed {persisted} cart(s) in {elapsed:.2f}s'
+            ))
+            if not options['loop']:
+                break
+            time.sleep(max(0, interval - elapsed))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from store.importers import FORMATS, ProductImporter, detect_format, read_rows
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Upsert products by slug from a CSV or NDJSON supplier feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Feed file to import, or - to read from stdin'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Feed format (default: guessed from the file extension)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows validated and written per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or detect_format(path)
+        if format is None:
+            raise CommandError('Cannot guess the feed format, pass --format')
+
+        importer = ProductImporter(batch_size=options['batch_size'])
+        if path == '-':
+            report = importer.run(read_rows(sys.stdin, format))
+        else:
+            with open(path, newline='', encoding='utf-8-sig') as feed:
+                report = importer.run(read_rows(feed, format))
+
+        for error in report['errors']:
+            self.stdout.write(self.style.WARNING(f'  Row {error["row"]}: {error["errors"]}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Imported {report["imported"]} of {report["rows"]} rows '
+            f'in {report["seconds"]:.2f}s ({report["rows_per_second"] or 0} rows/s)'
+        ))
+        if report['rejected']:
+            self.stdout.write(self.style.ERROR(f'✗ Rejected {report["rejected"]} rows'))
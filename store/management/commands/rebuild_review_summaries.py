@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from store.models import Product
+from store.reviews import summarize
+import time
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-product review summaries from the reviews table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Products summarized per transaction (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        start = time.perf_counter()
+        products = 0
+        summarized = 0
+        last_id = 0
+
+        while True:
+            ids = list(
+                Product.objects
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                summarized += summarize(ids)
+            products += len(ids)
+            last_id = ids[-1]
+            self.stdout.write(f'  {products} products processed')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Rebuilt {summarized} review summaries over {products} products '
+            f'in {time.perf_counter() - start:.2f}s'
+        ))
@@ -0,0 +1,40 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from store import analytics
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollup for the days touched since the last refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every day instead of the touched ones'
+        )
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            help='Also recompute every day from this date on (YYYY-MM-DD), '
+                 'e.g. after deleting orders'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=7,
+            help='Days recomputed per transaction (default: 7)'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        start = time.perf_counter()
+        days, rows = analytics.refresh(
+            full=options['full'], since=options['since'], chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Refreshed {days} day(s), {rows} rollup row(s) in {elapsed:.2f}s'
+        ))
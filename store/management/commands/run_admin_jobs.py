@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from store import jobs
+import time
+
+
+class Command(BaseCommand):
+    help = 'Run the queued chunks of bulk admin actions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for queued chunks every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds between polls with --loop (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            chunks = 0
+            while (job := jobs.run_next()) is not None:
+                chunks += 1
+                if job.finished_at is not None:
+                    self.stdout.write(
+                        f'  {job}: {job.get_status_display().lower()}, '
+                        f'{job.changed} of {job.total} row(s) changed, {job.failed} failed'
+                    )
+            elapsed = time.perf_counter() - start
+            if chunks or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'✓ Ran {chunks} chunk(s) in {elapsed:.2f}s'))
+            if not options['loop']:
+                break
+            time.sleep(max(0, options['interval'] - elapsed))
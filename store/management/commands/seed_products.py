@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from decimal import Decimal
-from store.models import Collection, Product
+from store.importers import ProductImporter
+from store.models import Collection
 
 
 class Command(BaseCommand):
@@ -105,18 +106,14 @@ class Command(BaseCommand):
             },
         ]
 
-        # Create products
-        created_count = 0
-        for product_data in products_data:
-            product, created = Product.objects.get_or_create(
-                slug=product_data['slug'],
-                defaults=product_data
-            )
-            if created:
-                created_count += 1
+        # Upsert products by slug in one batch
+        report = ProductImporter().run(
+            {**product_data, 'collection': product_data['collection'].title}
+            for product_data in products_data
+        )
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully created {created_count} products'
+                f'Successfully imported {report["imported"]} products'
             )
         )
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from store.models import Product, Review
+from store.reviews import summarize
 import random
 
 
@@ -105,6 +106,8 @@ class Command(BaseCommand):
                 if created:
                     created_count += 1
 
+        summarize(list(products.values_list('id', flat=True)))
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'Successfully created {created_count} reviews across {products.count()} products'
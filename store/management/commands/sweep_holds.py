@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from store import inventory
+import time
+
+
+class Command(BaseCommand):
+    help = 'Release expired cart holds back to available stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Holds released per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep sweeping every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60,
+            help='Seconds between sweeps with --loop (default: 60)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute reserved stock from the holds instead (run while carts are quiet)'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            updated = inventory.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt reserved stock of {updated} product(s)'))
+            return
+
+        while True:
+            start = time.perf_counter()
+            released = 0
+            while True:
+                swept = inventory.sweep(options['batch_size'])
+                released += swept
+                if swept < options['batch_size']:
+                    break
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Released {released} expired hold(s) in {elapsed:.2f}s'
+            ))
+            if not options['loop']:
+                break
+            time.sleep(max(0, options['interval'] - elapsed))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_alter_cartitem_cart_alter_cartitem_unique_together'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='cart',
+            options={'ordering': ['-created_at', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['-created_at', 'id'], name='store_cart_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['title', 'id'], name='store_product_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', '-created_at', 'id'], name='store_review_product_seek_idx'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:19
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# The statements are copied here rather than imported from store.search,
+# so later changes to that module cannot alter this migration.
+
+POSTGRES_INSTALL = [
+    """
+    CREATE OR REPLACE FUNCTION store_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS store_product_search_vector_trigger ON store_product',
+    """
+    CREATE TRIGGER store_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON store_product
+    FOR EACH ROW EXECUTE PROCEDURE store_product_search_vector_update()
+    """,
+    # Fires the trigger once for every existing row
+    'UPDATE store_product SET title = title',
+    """
+    CREATE INDEX IF NOT EXISTS store_product_search_idx
+    ON store_product USING GIN (search_vector)
+    """,
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS store_product_search_idx',
+    'DROP TRIGGER IF EXISTS store_product_search_vector_trigger ON store_product',
+    'DROP FUNCTION IF EXISTS store_product_search_vector_update()',
+]
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts USING fts5(
+        title, description,
+        content='store_product', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_product_fts_ai AFTER INSERT ON store_product BEGIN
+        INSERT INTO store_product_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_product_fts_ad AFTER DELETE ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_product_fts_au AFTER UPDATE OF title, description ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO store_product_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO store_product_fts(store_product_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS store_product_fts_ai',
+    'DROP TRIGGER IF EXISTS store_product_fts_ad',
+    'DROP TRIGGER IF EXISTS store_product_fts_au',
+    'DROP TABLE IF EXISTS store_product_fts',
+]
+
+
+def _execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, POSTGRES_INSTALL)
+    elif vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_INSTALL)
+
+
+def uninstall_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, POSTGRES_UNINSTALL)
+    elif vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_UNINSTALL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:22
+
+from itertools import count
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def deduplicate_slugs(apps, schema_editor):
+    """
+    Keep each duplicated slug on its oldest product and suffix the others
+    with their id, so the unique index can be built.
+    """
+    Product = apps.get_model('store', 'Product')
+    max_length = Product._meta.get_field('slug').max_length
+    duplicated = Product.objects \
+        .values('slug') \
+        .annotate(products=Count('id')) \
+        .filter(products__gt=1) \
+        .values_list('slug', flat=True)
+    for slug in list(duplicated):
+        for product in Product.objects.filter(slug=slug).order_by('id')[1:]:
+            for attempt in count():
+                suffix = f'-{product.id}' + (f'-{attempt}' if attempt else '')
+                candidate = slug[:max_length - len(suffix)] + suffix
+                if not Product.objects.filter(slug=candidate).exists():
+                    break
+            Product.objects.filter(pk=product.pk).update(slug=candidate)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=models.SlugField(unique=True),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    Order = apps.get_model('store', 'Order')
+    Order.objects.update(updated_at=F('placed_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_order_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.PositiveIntegerField()),
+                ('units', models.PositiveIntegerField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['placed_at'], name='store_order_placed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='store_order_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailysales',
+            name='collection',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.collection'),
+        ),
+        migrations.AddField(
+            model_name='dailysales',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.product'),
+        ),
+        migrations.AddIndex(
+            model_name='dailysales',
+            index=models.Index(fields=['product', 'day'], name='store_dailysales_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailysales',
+            index=models.Index(fields=['collection', 'day'], name='store_dailysales_coll_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailysales',
+            unique_together={('day', 'product')},
+        ),
+    ]
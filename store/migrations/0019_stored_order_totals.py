@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:06
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def count_orders(apps, schema_editor):
+    Customer = apps.get_model('store', 'Customer')
+    Order = apps.get_model('store', 'Order')
+    counts = Order.objects \
+        .filter(customer=OuterRef('pk')) \
+        .order_by() \
+        .values('customer') \
+        .annotate(count=Count('pk')) \
+        .values('count')
+    Customer.objects.update(orders_count=Coalesce(Subquery(counts), 0))
+
+
+def sum_order_lines(apps, schema_editor):
+    Order = apps.get_model('store', 'Order')
+    OrderItem = apps.get_model('store', 'OrderItem')
+    sums = OrderItem.objects \
+        .filter(order=OuterRef('pk')) \
+        .order_by() \
+        .values('order') \
+        .annotate(
+            total=Sum(F('quantity') * F('unit_price'),
+                      output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            item_count=Sum('quantity'))
+    # updated_at is left alone, the sales rollup has nothing new to see
+    Order.objects.update(
+        total=Coalesce(Subquery(sums.values('total')), Value(Decimal(0))),
+        item_count=Coalesce(Subquery(sums.values('item_count')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='orders_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(count_orders, migrations.RunPython.noop),
+        migrations.RunPython(sum_order_lines, migrations.RunPython.noop),
+    ]
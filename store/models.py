@@ -1,6 +1,16 @@
 import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models import Count, Exists, ExpressionWrapper, F, OuterRef, Prefetch, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+TAX_RATE = Decimal('1.1')
 
 
 class Promotion(models.Model):
@@ -8,10 +18,36 @@ class Promotion(models.Model):
     discount = models.FloatField()
 
 
+class CollectionQuerySet(models.QuerySet):
+    @staticmethod
+    def _counted_products():
+        counts = Product.objects \
+            .filter(collection=OuterRef('pk')) \
+            .order_by() \
+            .values('collection') \
+            .annotate(count=Count('pk')) \
+            .values('count')
+        return Coalesce(Subquery(counts), 0)
+
+    def drifted(self):
+        """Collections whose stored products_count is wrong."""
+        return self \
+            .annotate(actual_products_count=self._counted_products()) \
+            .exclude(products_count=F('actual_products_count'))
+
+    def recount_products(self):
+        """Recompute the stored products_count of these collections."""
+        return self.update(products_count=self._counted_products())
+
+
 class Collection(models.Model):
     title = models.CharField(max_length=255)
     featured_product = models.ForeignKey(
         'Product', on_delete=models.SET_NULL, null=True, related_name='+', blank=True)
+    # Kept in step by store.signals; repair with `manage.py recount`
+    products_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CollectionQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.title
@@ -20,9 +56,24 @@ class Collection(models.Model):
         ordering = ['title']
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_price_with_tax(self):
+        return self.annotate(price_with_tax=ExpressionWrapper(
+            F('unit_price') * Value(TAX_RATE),
+            output_field=models.DecimalField(max_digits=8, decimal_places=2)
+        ))
+
+    def with_references(self):
+        """Flag products that order lines or cart lines still point to."""
+        return self.annotate(
+            has_orders=Exists(OrderItem.objects.filter(product=OuterRef('pk'))),
+            in_carts=Exists(CartItem.objects.filter(product=OuterRef('pk'))),
+        )
+
+
 class Product(models.Model):
     title = models.CharField(max_length=255)
-    slug = models.SlugField()
+    slug = models.SlugField(unique=True)
     description = models.TextField(null=True, blank=True)
     unit_price = models.DecimalField(
         max_digits=6,
@@ -32,12 +83,27 @@ class Product(models.Model):
     last_update = models.DateTimeField(auto_now=True)
     collection = models.ForeignKey(Collection, on_delete=models.PROTECT)
     promotions = models.ManyToManyField(Promotion, blank=True)
+    # Maintained by a database trigger, see store.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a save can tell that the product changed collection
+        instance._loaded_collection_id = instance.__dict__.get('collection_id')
+        return instance
 
     def __str__(self) -> str:
         return self.title
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            # Keyset pagination seeks on (title, id)
+            models.Index(fields=['title', 'id'], name='store_product_title_id_idx'),
+        ]
 
 
 class Review(models.Model):
@@ -52,6 +118,86 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['product', '-created_at', 'id'],
+                name='store_review_product_seek_idx'),
+        ]
+
+
+class ReviewSummary(models.Model):
+    """Review count, rating total and 1-5 histogram of a product."""
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='review_summary')
+    count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    @property
+    def average(self):
+        if not self.count:
+            return None
+        return round(Decimal(self.rating_sum) / self.count, 2)
+
+    @property
+    def histogram(self):
+        return {
+            rating: getattr(self, f'rating_{rating}')
+            for rating in range(1, 6)
+        }
+
+
+class ProductStock(models.Model):
+    """Units of a product reserved by cart holds, see store.inventory."""
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='stock')
+    reserved = models.PositiveIntegerField(default=0)
+
+    @property
+    def available(self):
+        return self.product.inventory - self.reserved
+
+
+class InventoryHold(models.Model):
+    """A cart's time-limited reservation of units of one product."""
+    # Not a foreign key: carts of the cache engine hold stock before they
+    # are flushed, and holds of deleted carts simply expire.
+    cart_id = models.UUIDField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='holds')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = [['cart_id', 'product']]
+        indexes = [
+            models.Index(fields=['expires_at'], name='store_hold_expires_idx'),
+        ]
+
+
+class CustomerQuerySet(models.QuerySet):
+    @staticmethod
+    def _counted_orders():
+        counts = Order.objects \
+            .filter(customer=OuterRef('pk')) \
+            .order_by() \
+            .values('customer') \
+            .annotate(count=Count('pk')) \
+            .values('count')
+        return Coalesce(Subquery(counts), 0)
+
+    def drifted(self):
+        """Customers whose stored orders_count is wrong."""
+        return self \
+            .annotate(actual_orders_count=self._counted_orders()) \
+            .exclude(orders_count=F('actual_orders_count'))
+
+    def recount_orders(self):
+        """Recompute the stored orders_count of these customers."""
+        return self.update(orders_count=self._counted_orders())
 
 
 class Customer(models.Model):
@@ -71,6 +217,13 @@ class Customer(models.Model):
     birth_date = models.DateField(null=True, blank=True)
     membership = models.CharField(
         max_length=1, choices=MEMBERSHIP_CHOICES, default=MEMBERSHIP_BRONZE)
+    # The account that checks out as this customer
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    # Kept in step by store.signals; repair with `manage.py recount`
+    orders_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CustomerQuerySet.as_manager()
 
     def __str__(self):
         return f'{self.first_name} {self.last_name}'
@@ -79,6 +232,39 @@ class Customer(models.Model):
         ordering = ['first_name', 'last_name']
 
 
+class OrderQuerySet(models.QuerySet):
+    @staticmethod
+    def _summed_lines():
+        sums = OrderItem.objects \
+            .filter(order=OuterRef('pk')) \
+            .order_by() \
+            .values('order') \
+            .annotate(
+                total=Sum(F('quantity') * F('unit_price'),
+                          output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+                item_count=Sum('quantity'))
+        return {
+            'total': Coalesce(Subquery(sums.values('total')), Value(Decimal(0))),
+            'item_count': Coalesce(Subquery(sums.values('item_count')), 0),
+        }
+
+    def drifted(self):
+        """Orders whose stored total or item_count is wrong."""
+        actual = self._summed_lines()
+        return self \
+            .annotate(actual_total=actual['total'], actual_item_count=actual['item_count']) \
+            .exclude(total=F('actual_total'), item_count=F('actual_item_count'))
+
+    def recount_totals(self, **changes):
+        """Recompute the stored total and item_count of these orders."""
+        return self.update(**self._summed_lines(), **changes)
+
+    def with_items(self):
+        """Prefetch the order's lines with their product."""
+        return self.prefetch_related(
+            Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('product')))
+
+
 class Order(models.Model):
     PAYMENT_STATUS_PENDING = 'P'
     PAYMENT_STATUS_COMPLETE = 'C'
@@ -93,6 +279,32 @@ class Order(models.Model):
     payment_status = models.CharField(
         max_length=1, choices=PAYMENT_STATUS_CHOICES, default=PAYMENT_STATUS_PENDING)
     customer = models.ForeignKey(Customer, on_delete=models.PROTECT)
+    # Also moved when a line changes, see store.signals; drives the
+    # incremental refresh of DailySales
+    updated_at = models.DateTimeField(auto_now=True)
+    # Sums of the lines, kept in step by store.signals; repair with
+    # `manage.py recount`. item_count counts units.
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = OrderQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a save can tell that the order changed customer
+        instance._loaded_customer_id = instance.__dict__.get('customer_id')
+        return instance
+
+    class Meta:
+        indexes = [
+            # Order history of a customer, newest first, see CustomerOrderViewSet
+            models.Index(
+                fields=['customer', '-placed_at', '-id'],
+                name='store_order_customer_seek_idx'),
+            models.Index(fields=['placed_at'], name='store_order_placed_idx'),
+            models.Index(fields=['updated_at'], name='store_order_updated_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -101,6 +313,37 @@ class OrderItem(models.Model):
     quantity = models.PositiveSmallIntegerField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a save can recount the order a line moved from
+        instance._loaded_order_id = instance.__dict__.get('order_id')
+        return instance
+
+
+class DailySales(models.Model):
+    """Orders, units and revenue of a product on one day, see store.analytics."""
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    # The product's collection when the day was last rolled up
+    collection = models.ForeignKey(Collection, on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField()
+    units = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        unique_together = [['day', 'product']]
+        indexes = [
+            models.Index(fields=['product', 'day'], name='store_dailysales_product_idx'),
+            models.Index(fields=['collection', 'day'], name='store_dailysales_coll_idx'),
+        ]
+
+
+class Watermark(models.Model):
+    """How far an incremental job has processed its source rows."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+
 
 class Address(models.Model):
     street = models.CharField(max_length=255)
@@ -109,9 +352,53 @@ class Address(models.Model):
         Customer, on_delete=models.CASCADE)
 
 
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate subtotal (before promotions), line_count and total_items."""
+        return self.annotate(
+            line_count=Count('items'),
+            subtotal=Coalesce(
+                Sum(F('items__quantity') * F('items__product__unit_price'),
+                    output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+                Value(Decimal(0)),
+            ),
+            total_items=Coalesce(Sum('items__quantity'), Value(0)),
+        )
+
+    def with_items(self):
+        """Prefetch items with their product."""
+        return self.prefetch_related(
+            Prefetch('items', queryset=CartItem.objects.select_related('product')))
+
+    def with_promoted_items(self, product_ids):
+        """
+        Prefetch, as `promoted_items`, the lines of the given products only,
+        each annotated with its unit_price.
+        """
+        return self.prefetch_related(Prefetch(
+            'items',
+            queryset=CartItem.objects
+                .filter(product_id__in=product_ids)
+                .annotate(unit_price=F('product__unit_price'))
+                .only('id', 'cart_id', 'product_id', 'quantity'),
+            to_attr='promoted_items',
+        ))
+
+
 class Cart(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Moved by every item change, see store.carts.touch
+    last_activity = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at', 'id']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='store_cart_created_id_idx'),
+            models.Index(fields=['last_activity'], name='store_cart_last_activity_idx'),
+        ]
 
 
 class CartItem(models.Model):
@@ -121,3 +408,62 @@ class CartItem(models.Model):
 
     class Meta:
         unique_together = [['cart', 'product']]
+
+
+class AdminJob(models.Model):
+    """A bulk admin action run in chunks by `manage.py run_admin_jobs`, see store.jobs."""
+    STATUS_PENDING = 'P'
+    STATUS_RUNNING = 'R'
+    STATUS_DONE = 'D'
+    STATUS_FAILED = 'F'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    action = models.CharField(max_length=100)
+    description = models.CharField(max_length=255)
+    params = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # Rows selected, rows of finished and of failed chunks, and rows the
+    # action reported as changed
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Job #{self.pk}: {self.description}'
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+
+
+class AdminJobChunk(models.Model):
+    STATUS_PENDING = 'P'
+    STATUS_DONE = 'D'
+    STATUS_FAILED = 'F'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job = models.ForeignKey(AdminJob, on_delete=models.CASCADE, related_name='chunks')
+    # Primary keys of the rows, snapshotted when the job was queued
+    ids = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    changed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # The queue the workers claim from, oldest first
+            models.Index(fields=['id'], condition=Q(status='P'), name='store_jobchunk_pending_idx'),
+        ]
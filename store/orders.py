@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from . import inventory, pricing
+from .models import Cart, CartItem, InventoryHold, Order, OrderItem, Product, ProductStock
+
+
+class EmptyCart(Exception):
+    pass
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_ids):
+        super().__init__(product_ids)
+        self.product_ids = product_ids
+
+
+def checkout(cart_id, customer_id):
+    """
+    Turn a database cart into an order of the customer and delete the cart.
+
+    Runs in one transaction with the same dozen queries whatever the
+    number of lines: prices are read by one locking SELECT and snapshotted
+    after promotions, the inventory of every line is decremented by one
+    conditional UPDATE and the order lines are bulk-created, the order
+    being created with their totals. Units held by other carts are not
+    sold. Raises Cart.DoesNotExist, EmptyCart, or OutOfStock naming the
+    products that cannot cover their line, in which case nothing is
+    written.
+    """
+    with transaction.atomic():
+        # A second checkout of the same cart waits here, then finds it gone
+        if not Cart.objects.select_for_update().filter(pk=cart_id).exists():
+            raise Cart.DoesNotExist
+        lines = dict(CartItem.objects
+                     .filter(cart_id=cart_id)
+                     .values_list('product_id', 'quantity'))
+        if not lines:
+            raise EmptyCart
+
+        # Then the cart's holds, the stock rows and the products, in the
+        # order of store.inventory, so reservations of other carts cannot
+        # move while their stock is checked
+        held = dict(InventoryHold.objects
+                    .select_for_update()
+                    .filter(cart_id=cart_id)
+                    .order_by('product_id')
+                    .values_list('product_id', 'quantity'))
+        reserved = dict(ProductStock.objects
+                        .select_for_update()
+                        .filter(product_id__in=set(lines) | set(held))
+                        .order_by('product_id')
+                        .values_list('product_id', 'reserved'))
+        products = Product.objects \
+            .select_for_update() \
+            .filter(id__in=lines) \
+            .order_by('id') \
+            .values_list('id', 'unit_price', 'inventory')
+        prices = {}
+        short = []
+        for product_id, unit_price, stock in products:
+            prices[product_id] = unit_price
+            # Units reserved by other carts are not for sale
+            others = reserved.get(product_id, 0) - held.get(product_id, 0)
+            if stock - others < lines[product_id]:
+                short.append(product_id)
+        if short:
+            raise OutOfStock(short)
+        quote = pricing.quote(
+            (product_id, lines[product_id], unit_price)
+            for product_id, unit_price in prices.items())
+
+        # The cart's own holds become the sale below, which leaves the
+        # holds of other carts as the reserved units
+        inventory.release(cart_id)
+
+        quantities = Case(
+            *[When(id=product_id, then=Value(quantity)) for product_id, quantity in lines.items()],
+            output_field=IntegerField(),
+        )
+        others = Coalesce(
+            Subquery(ProductStock.objects.filter(product_id=OuterRef('id')).values('reserved')),
+            0)
+        sold = Product.objects \
+            .filter(id__in=lines, inventory__gte=quantities + others) \
+            .update(inventory=F('inventory') - quantities)
+        if sold != len(lines):
+            raise OutOfStock(sorted(set(lines) - set(prices)))
+
+        order = Order.objects.create(
+            customer_id=customer_id, total=quote.total, item_count=quote.total_items)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=product_id, quantity=quantity,
+                      unit_price=quote.lines[product_id].price)
+            for product_id, quantity in lines.items()
+        ])
+        Cart.objects.filter(pk=cart_id).delete()
+
+    return order
@@ -0,0 +1,252 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek pagination over a composite, unique ordering.
+
+    The cursor carries the full key of the boundary row, so every page is
+    fetched with `WHERE (k1, k2) > (v1, v2) ORDER BY k1, k2 LIMIT n` and
+    costs the same index range scan no matter how deep the client pages.
+    No COUNT(*) is issued.
+
+    Pages always follow the keyset ordering, so `?ordering=` and `?search=`,
+    which would reorder the rows, are rejected with a 400.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+    reordering_query_params = (api_settings.ORDERING_PARAM, api_settings.SEARCH_PARAM)
+    reordering_message = 'Not supported with cursor pagination.'
+
+    def __init__(self, ordering):
+        # e.g. ('title', 'id') or ('-created_at', 'id'); the last field
+        # must be unique so the key identifies exactly one row.
+        self.ordering = tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        rejected = [param for param in self.reordering_query_params if param in request.query_params]
+        if rejected:
+            raise ValidationError({param: [self.reordering_message] for param in rejected})
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self._flip(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._seek(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        if results:
+            self.first_key, self.last_key = self._key(results[0]), self._key(results[-1])
+        else:
+            self.first_key = self.last_key = None if position is None else self._jsonable(position)
+        return results
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last_key, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first_key, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = payload['k'], bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            # Values are checked here so a forged cursor is a 404 and not
+            # an error from the database. Keys are never null.
+            position = [field.to_python(value) for field, value in zip(self._fields(model), position)]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        if position is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        payload = json.dumps({'k': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _key(self, instance):
+        key = []
+        for field in self.ordering:
+            value = instance
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            key.append(value)
+        return self._jsonable(key)
+
+    @staticmethod
+    def _jsonable(key):
+        # Strings round-trip exactly through the ORM for dates, decimals
+        # and UUIDs; isoformat keeps microseconds.
+        return [
+            value.isoformat() if hasattr(value, 'isoformat')
+            else value if value is None or isinstance(value, (int, float, str))
+            else str(value)
+            for value in key
+        ]
+
+    def _fields(self, model):
+        fields = []
+        for name in self.ordering:
+            opts = model._meta
+            for attr in name.lstrip('-').split('__'):
+                field = opts.get_field(attr)
+                if field.related_model is not None:
+                    opts = field.related_model._meta
+            fields.append(field)
+        return fields
+
+    @staticmethod
+    def _flip(ordering):
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in ordering
+        )
+
+    @staticmethod
+    def _seek(ordering, position):
+        """Build `(k1, k2, ...) > (v1, v2, ...)` honoring each key's direction."""
+        clauses = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): value
+                for previous, value in zip(ordering[:index], position)
+            }
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': position[index]}))
+        return reduce(or_, clauses)
+
+
+class KeysetPaginationMixin:
+    """
+    Opt-in keyset pagination for a viewset.
+
+    Page number pagination stays the default; clients switch to cursor
+    paging with `?paginate=cursor` and then follow the `next` links.
+    Views with `keyset_always` page by cursor only.
+    """
+    keyset_ordering = None
+    keyset_always = False
+
+    def wants_keyset_pagination(self):
+        params = self.request.query_params
+        return (
+            self.keyset_ordering is not None
+            and (self.keyset_always
+                 or params.get('paginate') == 'cursor'
+                 or KeysetPagination.cursor_query_param in params)
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.wants_keyset_pagination():
+            self._paginator = KeysetPagination(self.keyset_ordering)
+        return super().paginator
+
+
+def estimated_rows(model, using):
+    """
+    Return the planner's estimate of the rows in the model's table, or None
+    when the database keeps none (SQLite, or a table never analyzed).
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(model._meta.db_table)])
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists of large tables, see EstimatedCountMixin.
+
+    An unfiltered queryset is counted from the planner's estimate of its
+    table's rows, a filtered one by counting at most `count_cap` rows, so
+    neither scans the table. Estimates below the cap, which are the least
+    reliable, and databases without estimates get the capped count too,
+    which is exact up to the cap. The count is only approximate beyond the
+    cap: pages past an estimate come back empty and rows past a capped
+    count are reached by narrowing the filters.
+    """
+    count_cap = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.count_cap:
+                return estimate
+        return queryset.order_by().values('pk')[:self.count_cap].count()
@@ -0,0 +1,87 @@
+"""
+Cart pricing with promotions.
+
+A promotion's discount is the fraction taken off the unit price (0.15 is
+15% off); a product with several promotions gets the best one. The
+discounted unit price is rounded to the cent before it is multiplied by
+the quantity, so a line, a cart and the order placed from it agree.
+
+The best discount of every promoted product is loaded with one grouped
+query and kept in-process until the PROMOTIONS version is bumped, which
+store.signals does whenever a Promotion or a product's promotions change.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+from django.db.models import Max
+from .caching import get_version
+from .models import Product
+
+
+PROMOTIONS = 'promotions'
+
+CENT = Decimal('0.01')
+
+_table = (None, {})
+
+
+class Line(NamedTuple):
+    product_id: int
+    quantity: int
+    unit_price: Decimal
+    price: Decimal
+    total: Decimal
+
+
+class Quote(NamedTuple):
+    lines: dict
+    subtotal: Decimal
+    discount: Decimal
+    total: Decimal
+    total_items: int
+
+
+def _fraction(discount):
+    return min(max(Decimal(str(discount)), Decimal(0)), Decimal(1))
+
+
+def discounts():
+    """Return {product_id: discount fraction} of every promoted product."""
+    global _table
+    version = get_version(PROMOTIONS)
+    if _table[0] != version:
+        best = Product.promotions.through.objects \
+            .order_by() \
+            .values('product_id') \
+            .annotate(best=Max('promotion__discount')) \
+            .values_list('product_id', 'best')
+        _table = (version, {
+            product_id: _fraction(discount)
+            for product_id, discount in best
+            if discount and discount > 0
+        })
+    return _table[1]
+
+
+def discounted(unit_price, discount):
+    return (unit_price * (1 - discount)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def quote(lines):
+    """
+    Price (product_id, quantity, unit_price) lines in one pass.
+
+    Lines of the same product must be merged beforehand, as in a cart.
+    """
+    table = discounts()
+    priced = {}
+    subtotal = total = Decimal(0)
+    total_items = 0
+    for product_id, quantity, unit_price in lines:
+        discount = table.get(product_id)
+        price = discounted(unit_price, discount) if discount else unit_price
+        line_total = price * quantity
+        priced[product_id] = Line(product_id, quantity, unit_price, price, line_total)
+        subtotal += unit_price * quantity
+        total += line_total
+        total_items += quantity
+    return Quote(priced, subtotal, subtotal - total, total, total_items)
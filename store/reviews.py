@@ -0,0 +1,84 @@
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from .caching import CATALOG, bump_version
+from .models import Product, Review, ReviewSummary
+
+
+def record_review(product_id, added=None, removed=None):
+    """
+    Apply one review change to the product's summary.
+
+    `added` is the rating of a new (or edited) review and `removed` the
+    rating it replaces, so an edit is `record_review(id, new, old)`.
+    Call inside the transaction that writes the review.
+    """
+    if added == removed:
+        return
+
+    changes = {}
+    for rating, delta in [(added, 1), (removed, -1)]:
+        if rating is None:
+            continue
+        changes['count'] = changes.get('count', F('count')) + delta
+        changes['rating_sum'] = changes.get('rating_sum', F('rating_sum')) + delta * rating
+        changes[f'rating_{rating}'] = F(f'rating_{rating}') + delta
+
+    ReviewSummary.objects.bulk_create(
+        [ReviewSummary(product_id=product_id)], ignore_conflicts=True)
+    ReviewSummary.objects.filter(product_id=product_id).update(**changes)
+
+    # The rating is part of the product representation, so move the
+    # validators used by conditional GETs and drop cached responses.
+    Product.objects.filter(pk=product_id).update(last_update=timezone.now())
+    bump_version(CATALOG)
+
+
+COUNTS = ['count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+def summarize(product_ids):
+    """
+    Recompute the summaries of the given products from their reviews.
+
+    Products whose summary changed get a new last_update and the catalog
+    is bumped, as record_review does.
+    """
+    totals = Review.objects \
+        .filter(product_id__in=product_ids) \
+        .order_by() \
+        .values('product_id') \
+        .annotate(
+            count=Count('id'),
+            rating_sum=Sum('rating'),
+            **{
+                f'rating_{rating}': Count('id', filter=Q(rating=rating))
+                for rating in range(1, 6)
+            })
+    summaries = [ReviewSummary(**row) for row in totals]
+
+    stored = {
+        row[0]: row[1:]
+        for row in ReviewSummary.objects
+        .filter(product_id__in=product_ids)
+        .values_list('product_id', *COUNTS)
+    }
+    changed = set(stored) - {summary.product_id for summary in summaries}
+    changed.update(
+        summary.product_id for summary in summaries
+        if stored.get(summary.product_id) != tuple(getattr(summary, name) for name in COUNTS)
+    )
+
+    ReviewSummary.objects \
+        .filter(product_id__in=product_ids) \
+        .exclude(product_id__in=[summary.product_id for summary in summaries]) \
+        .delete()
+    ReviewSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=COUNTS,
+    )
+    if changed:
+        Product.objects.filter(pk__in=changed).update(last_update=timezone.now())
+        bump_version(CATALOG)
+    return len(summaries)
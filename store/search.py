@@ -0,0 +1,121 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'store_product_fts'
+
+# External-content FTS5 table kept in sync by triggers, so queryset
+# updates and bulk writes are indexed as well as model saves. Migration
+# 0011 installs the same statements.
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='store_product', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    *SQLITE_TRIGGERS,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def ensure_search_index(connection):
+    """
+    Restore the SQLite sync triggers if a migration dropped them.
+
+    SQLite alters tables by copying them into a new one, which drops the
+    triggers attached to store_product; the FTS index is rebuilt after.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, count(*) FROM sqlite_master WHERE name LIKE %s GROUP BY type",
+            [f'{FTS_TABLE}%'])
+        installed = dict(cursor.fetchall())
+    # Only repair an index that the migration created in the first place
+    if installed.get('table') and installed.get('trigger', 0) < len(SQLITE_TRIGGERS):
+        _execute(connection, SQLITE_INSTALL)
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text.lower())
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    Full-text product search ranked by relevance.
+
+    Uses the trigger-maintained `search_vector` column and its GIN index on
+    PostgreSQL and the FTS5 index on SQLite. Every term is matched as a
+    prefix so results keep up while the user is typing. Other databases
+    fall back to the view's `search_fields`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(request.query_params.get(self.search_param, ''))
+        if not terms:
+            return queryset
+
+        vendor = connections[queryset.db].vendor
+        if vendor == 'postgresql':
+            return self.filter_postgres(queryset, terms)
+        if vendor == 'sqlite':
+            return self.filter_sqlite(queryset, terms)
+        return super().filter_queryset(request, queryset, view)
+
+    def filter_postgres(self, queryset, terms):
+        query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            config=SEARCH_CONFIG,
+            search_type='raw')
+        return queryset \
+            .filter(search_vector=query) \
+            .annotate(search_rank=SearchRank(F('search_vector'), query)) \
+            .order_by('-search_rank', 'id')
+
+    def filter_sqlite(self, queryset, terms):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset \
+            .filter(id__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])) \
+            .annotate(search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = store_product.id',
+                [match], output_field=FloatField())) \
+            .order_by('-search_rank', 'id')
@@ -1,6 +1,8 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Cart, CartItem, Customer, Product, Collection, Review
-from decimal import Decimal
+from .models import Cart, CartItem, Customer, Order, OrderItem, Product, Collection, Review, ReviewSummary, TAX_RATE
+from .carts import apply_operations, lock, touch
+from . import inventory, pricing
 
 
 class CollectionSerializer(serializers.ModelSerializer):
@@ -9,19 +11,79 @@ class CollectionSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'products_count']
     products_count = serializers.IntegerField(read_only=True)    
 
+class CollectionUrlField(serializers.HyperlinkedRelatedField):
+    """
+    Hyperlink to a collection built from a URL template.
+
+    The route is reversed once per serialization and the primary key is
+    substituted for every row, instead of calling reverse() per product.
+    """
+    placeholder = '__pk__'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.url_templates = {}
+
+    def get_url(self, obj, view_name, request, format):
+        if obj.pk in (None, ''):
+            return None
+        template = self.url_templates.get((view_name, format))
+        if template is None:
+            template = self.reverse(
+                view_name, kwargs={self.lookup_url_kwarg: self.placeholder},
+                request=request, format=format)
+            self.url_templates[(view_name, format)] = template
+        return template.replace(self.placeholder, str(obj.pk))
+
+
+class PriceWithTaxField(serializers.DecimalField):
+    """Reads the `price_with_tax` annotation, computing it for bare instances."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_digits', 8)
+        kwargs.setdefault('decimal_places', 2)
+        super().__init__(read_only=True, **kwargs)
+
+    def get_attribute(self, product):
+        price = getattr(product, 'price_with_tax', None)
+        if price is None:
+            price = product.unit_price * TAX_RATE
+        return price
+
+
+class ReviewSummarySerializer(serializers.ModelSerializer):
+    average = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+    histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = ReviewSummary
+        fields = ['count', 'average', 'histogram']
+
+    def get_attribute(self, instance):
+        # Products without reviews have no summary row
+        return super().get_attribute(instance) or ReviewSummary()
+
+
 class ProductSerializer(serializers.ModelSerializer):
-    price_with_tax = serializers.SerializerMethodField(method_name='calculate_tax')
+    price_with_tax = PriceWithTaxField()
+    rating = ReviewSummarySerializer(source='review_summary', read_only=True)
 
     class Meta:
         model = Product
-        fields = ['id', 'title', 'unit_price', 'collection', 'price_with_tax']
+        fields = ['id', 'title', 'unit_price', 'collection', 'price_with_tax', 'rating']
     
-    collection = serializers.HyperlinkedRelatedField(
+    collection = CollectionUrlField(
         queryset=Collection.objects.all(),
          view_name='collection-detail'
      )  # Nested serializer, creates a relationship between the two serializers
-    def calculate_tax(self, product: Product):
-        return product.unit_price * Decimal(1.1)
+
+
+class ProductBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -51,7 +113,10 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'product_id', 'quantity', 'total_price']
     
     def get_total_price(self, item: CartItem):
-        return item.quantity * item.product.unit_price
+        # Set by CartSerializer when the whole cart is priced
+        if hasattr(item, 'total_price'):
+            return item.total_price
+        return pricing.quote([(item.product_id, item.quantity, item.product.unit_price)]).total
     
     def validate_product_id(self, value):
         if not Product.objects.filter(pk=value).exists():
@@ -66,54 +131,179 @@ class CartItemSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         cart_id = self.context['cart_id']
         product_id = validated_data['product_id']
-        quantity = validated_data['quantity']
-        
-        # Check if product has sufficient inventory
-        product = Product.objects.get(pk=product_id)
-        if product.inventory < quantity:
-            raise serializers.ValidationError('Insufficient inventory')
-        
-        # Check if item already exists in cart
-        try:
-            cart_item = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
-            # Update quantity if item exists
-            cart_item.quantity += quantity
-            if product.inventory < cart_item.quantity:
+
+        with transaction.atomic():
+            # Changes to this cart queue on the lock of its row, so the
+            # line read below stays valid until commit.
+            lock(cart_id)
+            holds = inventory.lock_holds(cart_id, [product_id])
+            current = CartItem.objects \
+                .filter(cart_id=cart_id, product_id=product_id) \
+                .values_list('quantity', flat=True) \
+                .first() or 0
+            quantity = current + validated_data['quantity']
+            try:
+                inventory.set_holds(holds, {product_id: quantity})
+            except serializers.ValidationError:
                 raise serializers.ValidationError('Insufficient inventory')
-            cart_item.save()
-            return cart_item
-        except CartItem.DoesNotExist:
-            # Create new item
-            return CartItem.objects.create(cart_id=cart_id, **validated_data)
+
+            CartItem.objects.bulk_create(
+                [CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity)],
+                update_conflicts=True,
+                unique_fields=['cart', 'product'],
+                update_fields=['quantity'])
+            touch(cart_id)
+
+        return CartItem.objects.select_related('product').get(
+            cart_id=cart_id, product_id=product_id)
     
     def update(self, instance, validated_data):
         quantity = validated_data.get('quantity', instance.quantity)
-        
-        # Check inventory
-        if instance.product.inventory < quantity:
-            raise serializers.ValidationError('Insufficient inventory')
-        
+
+        with transaction.atomic():
+            lock(instance.cart_id)
+            holds = inventory.lock_holds(instance.cart_id, [instance.product_id])
+            try:
+                inventory.set_holds(holds, {instance.product_id: quantity})
+            except serializers.ValidationError:
+                raise serializers.ValidationError('Insufficient inventory')
+            CartItem.objects.filter(pk=instance.pk).update(quantity=quantity)
+            touch(instance.cart_id)
+
         instance.quantity = quantity
-        instance.save()
         return instance
 
 
+class CartItemOperationSerializer(serializers.Serializer):
+    OPERATIONS = ['add', 'set', 'remove']
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        if data['op'] != 'remove' and 'quantity' not in data:
+            raise serializers.ValidationError({'quantity': 'This field is required.'})
+        return data
+
+
+class CartItemBatchSerializer(serializers.Serializer):
+    """
+    Apply add / set / remove operations to a cart in one transaction.
+
+    Every product named is checked with one IN query and held for the
+    cart, then the cart lines are written with one bulk insert, one bulk
+    update and one delete.
+    """
+    operations = CartItemOperationSerializer(many=True, allow_empty=False, max_length=100)
+
+    def save(self):
+        cart_id = self.context['cart_id']
+        operations = self.validated_data['operations']
+        product_ids = {operation['product_id'] for operation in operations}
+
+        inventories = dict(
+            Product.objects.filter(id__in=product_ids).values_list('id', 'inventory'))
+        missing = product_ids - set(inventories)
+        if missing:
+            raise serializers.ValidationError({'products': {
+                product_id: 'Product does not exist' for product_id in sorted(missing)
+            }})
+
+        with transaction.atomic():
+            lock(cart_id)
+            holds = inventory.lock_holds(cart_id, product_ids)
+            lines = {
+                item.product_id: item
+                for item in CartItem.objects.filter(cart_id=cart_id, product_id__in=product_ids)
+            }
+            current = {product_id: item.quantity for product_id, item in lines.items()}
+            items = apply_operations(current, operations, inventories)
+            inventory.set_holds(holds, {
+                product_id: items.get(product_id, 0) for product_id in product_ids
+            })
+
+            created = [
+                CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity)
+                for product_id, quantity in items.items()
+                if product_id not in lines
+            ]
+            updated = []
+            for product_id, item in lines.items():
+                if product_id in items and items[product_id] != item.quantity:
+                    item.quantity = items[product_id]
+                    updated.append(item)
+            removed = [item.id for product_id, item in lines.items() if product_id not in items]
+
+            CartItem.objects.bulk_create(created)
+            CartItem.objects.bulk_update(updated, ['quantity'])
+            CartItem.objects.filter(id__in=removed).delete()
+            touch(cart_id)
+
+
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.SerializerMethodField()
     total_items = serializers.SerializerMethodField()
+    subtotal = serializers.SerializerMethodField()
+    discount = serializers.SerializerMethodField()
 
     class Meta:
         model = Cart
-        fields = ['id', 'created_at', 'items', 'total_price', 'total_items']
+        fields = ['id', 'created_at', 'items', 'total_price', 'total_items', 'subtotal', 'discount']
         read_only_fields = ['id', 'created_at']
     
+    def price(self, cart: Cart):
+        """Price every line of the cart in one pass over its items."""
+        items = cart.items.all()
+        quote = pricing.quote(
+            (item.product_id, item.quantity, item.product.unit_price) for item in items)
+        for item in items:
+            item.total_price = quote.lines[item.product_id].total
+        cart.total_price = quote.total
+        cart.total_items = quote.total_items
+        cart.subtotal = quote.subtotal
+        cart.line_count = len(quote.lines)
+        cart.discount = quote.discount
+
+    def to_representation(self, cart: Cart):
+        if not hasattr(cart, 'total_price'):
+            self.price(cart)
+        return super().to_representation(cart)
+
     def get_total_price(self, cart: Cart):
-        return sum([item.quantity * item.product.unit_price for item in cart.items.all()])
-    
+        return cart.total_price
+
     def get_total_items(self, cart: Cart):
-        return sum([item.quantity for item in cart.items.all()]) 
-    
+        return cart.total_items
+
+    def get_subtotal(self, cart: Cart):
+        # Before promotions; what ?min_value= / ?max_value= filter on
+        return cart.subtotal
+
+    def get_discount(self, cart: Cart):
+        return cart.discount
+
+
+class CartSummarySerializer(CartSerializer):
+    """Cart counts and totals without the item lines"""
+    line_count = serializers.SerializerMethodField()
+
+    class Meta(CartSerializer.Meta):
+        fields = ['id', 'created_at', 'line_count', 'total_items', 'total_price', 'subtotal', 'discount']
+
+    def get_line_count(self, cart: Cart):
+        return cart.line_count
+
+    def price(self, cart: Cart):
+        # Carts from with_totals().with_promoted_items() only load the
+        # lines a promotion applies to
+        if not hasattr(cart, 'promoted_items'):
+            return super().price(cart)
+        quote = pricing.quote(
+            (item.product_id, item.quantity, item.unit_price) for item in cart.promoted_items)
+        cart.total_price = cart.subtotal - quote.discount
+        cart.discount = quote.discount
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -121,4 +311,68 @@ class CustomerSerializer(serializers.ModelSerializer):
     user_id = serializers.IntegerField(read_only=True)
     class Meta:
         model = Customer
-        fields = ['id','user_id', 'first_name', 'last_name', 'email', 'phone', 'birth_date', 'membership']    
\ No newline at end of file
+        fields = ['id','user_id', 'first_name', 'last_name', 'email', 'phone', 'birth_date', 'membership']
+
+
+class CartMergeSerializer(serializers.Serializer):
+    from_cart = serializers.UUIDField()
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """
+    The order goes to the requesting user's customer; staff may name
+    another customer with customer_id.
+    """
+    customer_id = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        user = self.context['request'].user
+        customer_id = data.get('customer_id')
+        if customer_id is not None and user.is_staff:
+            if not Customer.objects.filter(pk=customer_id).exists():
+                raise serializers.ValidationError({'customer_id': 'Customer does not exist'})
+            return data
+
+        own = Customer.objects.filter(user=user).values_list('id', flat=True).first()
+        if own is None:
+            raise serializers.ValidationError('No customer belongs to this user')
+        if customer_id not in (None, own):
+            raise serializers.ValidationError({'customer_id': 'Only staff can check out for another customer'})
+        return {'customer_id': own}
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    product = SimpleProductSerializer(read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product', 'quantity', 'unit_price']
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, read_only=True, source='orderitem_set')
+
+    class Meta:
+        model = Order
+        fields = ['id', 'customer', 'placed_at', 'payment_status', 'total', 'item_count', 'items']
+
+
+class SalesDaySerializer(serializers.Serializer):
+    day = serializers.DateField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class SalesProductSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    title = serializers.CharField(source='product__title')
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class SalesCollectionSerializer(serializers.Serializer):
+    collection_id = serializers.IntegerField()
+    title = serializers.CharField(source='collection__title')
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
@@ -0,0 +1,130 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connections
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from .caching import CATALOG, bump_version
+from .models import Collection, Customer, Order, OrderItem, Product, Promotion
+from .pricing import PROMOTIONS
+from .search import ensure_search_index
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(m2m_changed, sender=Product.promotions.through)
+def invalidate_catalog(sender, **kwargs):
+    if _removed_products.get() is None:
+        bump_version(CATALOG)
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(m2m_changed, sender=Product.promotions.through)
+def invalidate_promotions(sender, **kwargs):
+    bump_version(PROMOTIONS)
+
+
+def _add_products(collection_id, delta):
+    Collection.objects \
+        .filter(pk=collection_id) \
+        .update(products_count=F('products_count') + delta)
+
+
+@receiver(post_save, sender=Product)
+def count_saved_product(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_collection_id', None)
+    if created:
+        _add_products(instance.collection_id, 1)
+    elif previous is not None and previous != instance.collection_id:
+        _add_products(previous, -1)
+        _add_products(instance.collection_id, 1)
+    instance._loaded_collection_id = instance.collection_id
+
+
+# Collection ids and the products deleted from them, while inside
+# deleting_products()
+_removed_products = ContextVar('removed_products', default=None)
+
+
+@contextmanager
+def deleting_products():
+    """
+    Batch the bookkeeping of products deleted inside the block: instead of
+    one products_count UPDATE and one catalog bump per product, every
+    collection is decremented by one grouped UPDATE and the catalog is
+    bumped once, on the way out.
+    """
+    removed = Counter()
+    token = _removed_products.set(removed)
+    try:
+        yield
+    finally:
+        _removed_products.reset(token)
+    if removed:
+        Collection.objects \
+            .filter(pk__in=removed) \
+            .update(products_count=F('products_count') - Case(
+                *[When(pk=pk, then=Value(count)) for pk, count in removed.items()]))
+        bump_version(CATALOG)
+
+
+@receiver(post_delete, sender=Product)
+def count_deleted_product(sender, instance, **kwargs):
+    removed = _removed_products.get()
+    if removed is None:
+        _add_products(instance.collection_id, -1)
+    else:
+        removed[instance.collection_id] += 1
+
+
+def _add_orders(customer_id, delta):
+    Customer.objects \
+        .filter(pk=customer_id) \
+        .update(orders_count=F('orders_count') + delta)
+
+
+@receiver(post_save, sender=Order)
+def count_saved_order(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_customer_id', None)
+    if created:
+        _add_orders(instance.customer_id, 1)
+    elif previous is not None and previous != instance.customer_id:
+        _add_orders(previous, -1)
+        _add_orders(instance.customer_id, 1)
+    instance._loaded_customer_id = instance.customer_id
+
+
+@receiver(post_delete, sender=Order)
+def count_deleted_order(sender, instance, **kwargs):
+    _add_orders(instance.customer_id, -1)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def recount_order(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Moving updated_at also marks the order's day for the next
+    # incremental sales rollup
+    order_ids = {instance.order_id, getattr(instance, '_loaded_order_id', None)} - {None}
+    Order.objects \
+        .filter(pk__in=order_ids) \
+        .recount_totals(updated_at=timezone.now())
+    instance._loaded_order_id = instance.order_id
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    if sender.name == 'store':
+        ensure_search_index(connections[using])
@@ -0,0 +1,52 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from store.models import Collection, Customer, Product, ProductStock
+
+
+# The project settings point at Redis; tests get a private cache
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_product(collection, slug, title='Product', unit_price=10, inventory=10):
+    return Product.objects.create(
+        title=title, slug=slug, unit_price=Decimal(unit_price),
+        inventory=inventory, collection=collection)
+
+
+def make_customer(email='customer@example.com', user=None):
+    return Customer.objects.create(
+        first_name='Ada', last_name='Lovelace', email=email, phone='1', user=user)
+
+
+def make_user(username='shopper', is_staff=False, is_superuser=False):
+    return get_user_model().objects.create_user(
+        username=username, email=f'{username}@example.com', password='secret',
+        is_staff=is_staff, is_superuser=is_superuser)
+
+
+def reserved(product):
+    return ProductStock.objects.filter(product=product).values_list('reserved', flat=True).first() or 0
+
+
+@override_settings(CACHES=LOCMEM)
+class StoreTestCase(TestCase):
+    def setUp(self):
+        # LocMem outlives the test, and versions only move on commit
+        cache.clear()
+        self.client = APIClient()
+        self.collection = Collection.objects.create(title='Tools')
+
+    def login_admin(self):
+        self.client.force_authenticate(make_user('admin', is_staff=True))
+
+    def create_cart(self, lines=()):
+        cart_id = self.client.post('/store/carts/').json()['id']
+        for product, quantity in lines:
+            response = self.client.post(
+                f'/store/carts/{cart_id}/items/',
+                {'product_id': product.id, 'quantity': quantity}, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+        return cart_id
@@ -0,0 +1,39 @@
+from unittest import mock
+from django.db import connection
+from django.test import Client
+from store.models import Product
+from store.pagination import EstimatedCountPaginator, estimated_rows
+from .base import StoreTestCase, make_product, make_user
+
+
+class EstimatedCountPaginatorTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(12):
+            make_product(self.collection, f'product-{index}', inventory=index)
+
+    @mock.patch.object(EstimatedCountPaginator, 'count_cap', 5)
+    def test_counts_stop_at_the_cap(self):
+        queryset = Product.objects.order_by('id')
+        self.assertEqual(EstimatedCountPaginator(queryset.filter(inventory__lt=3), 2).count, 3)
+        self.assertEqual(EstimatedCountPaginator(queryset.filter(inventory__gte=3), 2).count, 5)
+
+    @mock.patch.object(EstimatedCountPaginator, 'count_cap', 5)
+    def test_unfiltered_counts_use_the_estimate(self):
+        queryset = Product.objects.order_by('id')
+        if connection.vendor != 'postgresql':
+            self.assertIsNone(estimated_rows(Product, queryset.db))
+            self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 5)
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE store_product')
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 12)
+
+    def test_changelists_render(self):
+        client = Client()
+        client.force_login(make_user('admin', is_staff=True, is_superuser=True))
+        for model in ['product', 'customer', 'order']:
+            response = client.get(f'/admin/store/{model}/?q=')
+            self.assertEqual(response.status_code, 200, model)
+        response = client.get('/admin/store/product/?inventory=%3C10')
+        self.assertContains(response, '10 products')
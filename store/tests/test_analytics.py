@@ -0,0 +1,67 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from store import analytics
+from store.models import Collection, DailySales, Order, OrderItem
+from .base import StoreTestCase, make_customer, make_product
+
+
+class SalesRollupTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = make_customer()
+        self.hammer = make_product(self.collection, 'hammer', unit_price=10)
+        self.hose = make_product(Collection.objects.create(title='Garden'), 'hose', unit_price=4)
+        self.monday = self.order(date(2026, 1, 5), (self.hammer, 2), (self.hose, 1))
+        self.order(date(2026, 1, 5), (self.hammer, 1))
+        self.order(date(2026, 1, 6), (self.hose, 5))
+        # Placed well before the refreshes below
+        Order.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def order(self, day, *lines):
+        order = Order.objects.create(customer=self.customer)
+        for product, quantity in lines:
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, unit_price=product.unit_price)
+        placed_at = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+        Order.objects.filter(id=order.id).update(placed_at=placed_at)
+        return order
+
+    def report(self, name, query=''):
+        response = self.client.get(f'/store/reports/sales/{name}/{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['results']
+
+    def test_reports_read_the_rollup(self):
+        call_command('refresh_sales_rollup', stdout=StringIO())
+        self.assertEqual(self.client.get('/store/reports/sales/days/').status_code, 401)
+        self.login_admin()
+
+        self.assertEqual(self.report('days'), [
+            {'day': '2026-01-06', 'units': 5, 'revenue': 20.0},
+            {'day': '2026-01-05', 'units': 4, 'revenue': 34.0},
+        ])
+        self.assertEqual(
+            [(row['title'], row['orders'], row['units']) for row in self.report('products')],
+            [(self.hammer.title, 2, 3), (self.hose.title, 2, 6)])
+        self.assertEqual(
+            [(row['title'], row['revenue']) for row in self.report('collections', '?end=2026-01-05')],
+            [('Tools', 30.0), ('Garden', 4.0)])
+
+    def test_refresh_follows_changed_and_deleted_orders(self):
+        self.assertEqual(analytics.refresh(), (2, 3))
+        self.assertEqual(analytics.refresh(), (0, 0))
+
+        OrderItem.objects.create(order=self.monday, product=self.hose, quantity=1, unit_price=4)
+        self.assertEqual(analytics.refresh(), (1, 2))
+        self.assertEqual(DailySales.objects.get(day=date(2026, 1, 5), product=self.hose).units, 2)
+
+        tuesday = Order.objects.get(placed_at__date=date(2026, 1, 6))
+        tuesday.orderitem_set.all().delete()
+        tuesday.delete()
+        analytics.refresh(since=date(2026, 1, 6))
+        self.assertFalse(DailySales.objects.filter(day=date(2026, 1, 6)).exists())
+
+    def test_benchmark_needs_a_scratch_database(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_sales_rollup', stdout=StringIO())
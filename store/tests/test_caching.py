@@ -0,0 +1,52 @@
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from store.caching import CATALOG, cache_stats, get_version
+from store.checks import check_shared_cache
+from store.models import Product
+from .base import StoreTestCase, make_product
+
+
+class CatalogCacheTests(StoreTestCase):
+    def test_product_changes_drop_cached_responses(self):
+        product = make_product(self.collection, 'hammer')
+        self.assertEqual(self.client.get('/store/products/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/store/products/')['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(f'/store/products/{product.id}/')['X-Cache'], 'MISS')
+        self.assertEqual(cache_stats(CATALOG), {'hits': 1, 'misses': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.title = 'Sledgehammer'
+            product.save()
+
+        response = self.client.get('/store/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['title'], 'Sledgehammer')
+
+    def test_versions_move_on_commit_only(self):
+        make_product(self.collection, 'hammer')
+        self.client.get('/store/products/')
+        version = get_version(CATALOG)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Product.objects.update(title='Renamed')
+            make_product(self.collection, 'saw')
+            self.assertEqual(self.client.get('/store/products/')['X-Cache'], 'HIT')
+        self.assertTrue(callbacks)
+        self.assertEqual(get_version(CATALOG), version)
+
+    def test_query_strings_are_cached_apart(self):
+        make_product(self.collection, 'hammer')
+        self.client.get('/store/products/?page=1')
+        self.assertEqual(self.client.get('/store/products/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/store/products/?page=1')['X-Cache'], 'HIT')
+
+
+class SharedCacheTests(StoreTestCase):
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['store.W001'])
+        with self.assertRaises(CommandError):
+            call_command('cache_stats')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                           'LOCATION': '/tmp/store-test-cache'}})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
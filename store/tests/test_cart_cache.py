@@ -0,0 +1,60 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from store.carts import CacheCartStore, CartBusy
+from store.checks import check_cart_cache
+from store.models import Cart, CartItem, InventoryHold
+from .base import StoreTestCase, make_product
+
+
+@override_settings(STORE_CART_STORAGE={'ENGINE': 'cache', 'LOCK_WAIT': 0})
+class CacheCartStoreTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_product(self.collection, 'hammer')
+        self.saw = make_product(self.collection, 'saw')
+
+    def test_carts_live_in_the_cache_until_flushed(self):
+        cart_id = self.create_cart([(self.hammer, 2), (self.saw, 1), (self.hammer, 1)])
+        cart = self.client.get(f'/store/carts/{cart_id}/').json()
+        self.assertEqual(sorted(item['quantity'] for item in cart['items']), [1, 3])
+        self.assertFalse(Cart.objects.filter(id=cart_id).exists())
+        self.assertEqual(InventoryHold.objects.get(product=self.hammer).quantity, 3)
+
+        call_command('flush_carts', stdout=StringIO())
+        self.assertEqual(
+            dict(CartItem.objects.filter(cart_id=cart_id).values_list('product_id', 'quantity')),
+            {self.hammer.id: 3, self.saw.id: 1})
+
+        self.client.delete(f'/store/carts/{cart_id}/items/{self.saw.id}/')
+        self.assertEqual(self.client.delete(f'/store/carts/{cart_id}/').status_code, 204)
+        self.assertFalse(InventoryHold.objects.exists())
+        self.assertEqual(self.client.get(f'/store/carts/{cart_id}/').status_code, 404)
+        CacheCartStore().flush()
+        self.assertFalse(Cart.objects.filter(id=cart_id).exists())
+
+    def test_writes_from_stale_states_are_all_kept(self):
+        first, second = CacheCartStore(), CacheCartStore()
+        cart_id = first.create()['id']
+        # Both requests loaded the cart before either wrote it
+        state, stale = first.load(cart_id), second.load(cart_id)
+        first.add_item(state, self.hammer.id, 2)
+        second.add_item(stale, self.saw.id, 1)
+        second.add_item(stale, self.hammer.id, 1)
+        self.assertEqual(first.load(cart_id)['items'], {self.hammer.id: 3, self.saw.id: 1})
+
+    def test_locked_carts_are_busy(self):
+        first, second = CacheCartStore(), CacheCartStore()
+        state = first.create()
+        with first.lock(state['id']):
+            first.add_item(state, self.hammer.id, 1)
+            with self.assertRaises(CartBusy):
+                second.add_item(second.load(state['id']), self.saw.id, 1)
+        second.add_item(second.load(state['id']), self.saw.id, 1)
+
+    def test_process_local_cache_is_an_error(self):
+        self.assertEqual([error.id for error in check_cart_cache(None)], ['store.E001'])
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': '/tmp/store-test-cache'}}):
+            self.assertEqual(check_cart_cache(None), [])
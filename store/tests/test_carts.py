@@ -0,0 +1,244 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from store.models import Cart, CartItem, Collection, InventoryHold, Product, ProductStock, Promotion
+from .base import LOCMEM, StoreTestCase, make_product, reserved
+
+
+class CartBatchTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_product(self.collection, 'hammer', inventory=5)
+        self.saw = make_product(self.collection, 'saw')
+        self.rake = make_product(self.collection, 'rake')
+        self.cart_id = self.create_cart([(self.hammer, 1), (self.rake, 2)])
+
+    def batch(self, *operations):
+        return self.client.post(
+            f'/store/carts/{self.cart_id}/items/batch/', {'operations': operations}, format='json')
+
+    def lines(self):
+        cart = self.client.get(f'/store/carts/{self.cart_id}/').json()
+        return {item['product']['id']: item['quantity'] for item in cart['items']}
+
+    def test_operations_apply_in_order(self):
+        response = self.batch(
+            {'op': 'add', 'product_id': self.hammer.id, 'quantity': 2},
+            {'op': 'set', 'product_id': self.saw.id, 'quantity': 4},
+            {'op': 'add', 'product_id': self.saw.id, 'quantity': 1},
+            {'op': 'remove', 'product_id': self.rake.id})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.lines(), {self.hammer.id: 3, self.saw.id: 5})
+        self.assertEqual((reserved(self.hammer), reserved(self.saw), reserved(self.rake)), (3, 5, 0))
+
+    def test_invalid_batches_change_nothing(self):
+        response = self.batch(
+            {'op': 'set', 'product_id': self.saw.id, 'quantity': 1},
+            {'op': 'add', 'product_id': self.hammer.id, 'quantity': 5})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'products': {str(self.hammer.id): 'Insufficient inventory'}})
+        response = self.batch(
+            {'op': 'set', 'product_id': self.saw.id, 'quantity': 1},
+            {'op': 'remove', 'product_id': 10**6})
+        self.assertEqual(response.json(), {'products': {str(10**6): 'Product does not exist'}})
+        self.assertEqual(self.batch({'op': 'set', 'product_id': self.saw.id}).status_code, 400)
+        self.assertEqual(self.lines(), {self.hammer.id: 1, self.rake.id: 2})
+        self.assertEqual((reserved(self.hammer), reserved(self.saw)), (1, 0))
+
+
+class CartSummaryTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_product(self.collection, 'hammer', unit_price='19.99')
+        self.saw = make_product(self.collection, 'saw', unit_price=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hammer.promotions.add(Promotion.objects.create(description='Spring', discount=0.15))
+
+    def test_summaries_match_the_full_carts(self):
+        self.create_cart([(self.hammer, 3), (self.saw, 1)])
+        self.create_cart([(self.saw, 2)])
+        self.create_cart()
+        full = self.client.get('/store/carts/?page_size=10').json()['results']
+        summaries = self.client.get('/store/carts/?summary=true').json()['results']
+
+        self.assertEqual([set(cart) for cart in summaries[:1]], [
+            {'id', 'created_at', 'line_count', 'total_items', 'total_price', 'subtotal', 'discount'}])
+        self.assertEqual(
+            [(c['id'], c['total_price'], c['total_items'], c['subtotal'], c['discount']) for c in summaries],
+            [(c['id'], c['total_price'], c['total_items'], c['subtotal'], c['discount']) for c in full])
+        self.assertEqual([cart['line_count'] for cart in summaries], [0, 1, 2])
+        self.assertEqual((summaries[2]['total_price'], summaries[2]['discount']), (80.97, 9.0))
+
+        cart_id = summaries[2]['id']
+        self.assertEqual(self.client.get(f'/store/carts/{cart_id}/?summary=1').json(), summaries[2])
+
+    def test_filters_bound_age_and_subtotal(self):
+        promoted = self.create_cart([(self.hammer, 3)])
+        plain = self.create_cart([(self.saw, 2)])
+        old = self.create_cart([(self.saw, 1)])
+        Cart.objects.filter(id=old).update(created_at=timezone.now() - timedelta(days=10))
+
+        def listed(query):
+            carts = self.client.get(f'/store/carts/?summary=true&{query}').json()['results']
+            return {cart['id']: (cart['subtotal'], cart['total_price']) for cart in carts}
+
+        self.assertEqual(listed('min_age=7'), {old: (30.0, 30.0)})
+        self.assertEqual(set(listed('max_age=7')), {promoted, plain})
+        # 59.97 before promotions, 50.97 after: bounded by the subtotal
+        self.assertEqual(listed('min_value=55&max_value=59.97'), {promoted: (59.97, 50.97)})
+        self.assertEqual(set(listed('min_value=30.01')), {promoted, plain})
+        self.assertEqual(self.client.get('/store/carts/?min_value=-1').status_code, 400)
+
+    def test_summaries_do_not_load_items(self):
+        def queries():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get('/store/carts/?summary=true')
+            return len(context)
+
+        self.create_cart([(self.hammer, 1), (self.saw, 1)])
+        one = queries()
+        for _ in range(3):
+            self.create_cart([(self.hammer, 1), (self.saw, 2)])
+        self.assertEqual(queries(), one)
+
+
+class PurgeCartsTests(StoreTestCase):
+    def test_only_abandoned_carts_are_purged(self):
+        product = make_product(self.collection, 'hammer')
+        abandoned = [self.create_cart([(product, 1)]) for _ in range(3)]
+        revisited = self.create_cart()
+        recent = self.create_cart()
+        long_ago = timezone.now() - timedelta(days=40)
+        Cart.objects.filter(id__in=abandoned + [revisited]).update(created_at=long_ago, last_activity=long_ago)
+        self.client.post(f'/store/carts/{revisited}/items/', {'product_id': product.id, 'quantity': 1})
+
+        out = StringIO()
+        call_command('purge_carts', dry_run=True, stdout=out)
+        self.assertIn('Would delete 3 cart(s) and 3 item(s)', out.getvalue())
+        self.assertEqual(Cart.objects.count(), 5)
+
+        call_command('purge_carts', chunk_size=2, stdout=out)
+        self.assertEqual({str(id) for id in Cart.objects.values_list('id', flat=True)}, {revisited, recent})
+        self.assertEqual(CartItem.objects.count(), 1)
+
+
+class MergeTests(StoreTestCase):
+    def merge(self, target, source):
+        return self.client.post(f'/store/carts/{target}/merge/', {'from_cart': source}, format='json')
+
+    def holds(self):
+        return dict(InventoryHold.objects.values_list('product_id', 'quantity'))
+
+    def test_merge_sums_lines_and_moves_holds(self):
+        hammer = make_product(self.collection, 'hammer')
+        saw = make_product(self.collection, 'saw')
+        target = self.create_cart([(hammer, 2)])
+        source = self.create_cart([(hammer, 3), (saw, 1)])
+
+        response = self.merge(target, source)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        lines = {item['product']['id']: item['quantity'] for item in response.json()['items']}
+        self.assertEqual(lines, {hammer.id: 5, saw.id: 1})
+        self.assertEqual(self.holds(), {hammer.id: 5, saw.id: 1})
+        self.assertEqual({str(cart_id) for cart_id in InventoryHold.objects.values_list('cart_id', flat=True)},
+                         {target})
+        self.assertEqual(reserved(hammer), 5)
+        self.assertFalse(Cart.objects.filter(pk=source).exists())
+
+    def test_holds_follow_capped_and_dropped_lines(self):
+        hammer = make_product(self.collection, 'hammer', inventory=10)
+        saw = make_product(self.collection, 'saw', inventory=10)
+        target = self.create_cart([(hammer, 4)])
+        source = self.create_cart([(hammer, 5), (saw, 2)])
+        # Stock counted down after the carts were filled
+        Product.objects.filter(id=hammer.id).update(inventory=6)
+        Product.objects.filter(id=saw.id).update(inventory=0)
+
+        response = self.merge(target, source)
+
+        lines = {item['product']['id']: item['quantity'] for item in response.json()['items']}
+        self.assertEqual(lines, {hammer.id: 6})
+        self.assertEqual(self.holds(), {hammer.id: 6})
+        self.assertEqual((reserved(hammer), reserved(saw)), (6, 0))
+
+    def test_merge_into_itself_is_rejected(self):
+        cart_id = self.create_cart()
+        self.assertEqual(self.merge(cart_id, cart_id).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM)
+class ConcurrentCartAddTests(TransactionTestCase):
+    """Adds to one cart from several connections at once."""
+    THREADS = 6
+    ADDS = 5
+
+    def setUp(self):
+        if connection.vendor == 'sqlite':
+            if connection.is_in_memory_db():
+                self.skipTest('Threads cannot share an in-memory SQLite database')
+            # SQLite has no row locks; writers queue on the database lock,
+            # which a deferred transaction cannot wait for once it has read
+            options = connections.settings['default'].setdefault('OPTIONS', {})
+            saved = dict(options)
+            options.update(transaction_mode='IMMEDIATE', timeout=30)
+            self.addCleanup(self.restore_options, options, saved)
+        collection = Collection.objects.create(title='Tools')
+        self.products = [make_product(collection, f'product-{index}', inventory=100)
+                         for index in range(self.THREADS)]
+        self.cart_id = APIClient().post('/store/carts/').json()['id']
+
+    @staticmethod
+    def restore_options(options, saved):
+        options.clear()
+        options.update(saved)
+
+    def add_concurrently(self, same_product):
+        failures = []
+
+        def add(product):
+            client = APIClient()
+            try:
+                for _ in range(self.ADDS):
+                    response = client.post(
+                        f'/store/carts/{self.cart_id}/items/',
+                        {'product_id': product.id, 'quantity': 1}, format='json')
+                    if response.status_code != 201:
+                        failures.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=add, args=(self.products[0 if same_product else index],))
+            for index in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+        return APIClient().get(f'/store/carts/{self.cart_id}/').json()
+
+    def test_adds_of_one_product_are_all_counted(self):
+        cart = self.add_concurrently(same_product=True)
+        self.assertEqual([item['quantity'] for item in cart['items']], [self.THREADS * self.ADDS])
+        self.assertEqual(ProductStock.objects.get(product=self.products[0]).reserved,
+                         self.THREADS * self.ADDS)
+
+    def test_adds_of_many_products_are_all_kept(self):
+        cart = self.add_concurrently(same_product=False)
+        self.assertEqual(sorted(item['quantity'] for item in cart['items']), [self.ADDS] * self.THREADS)
+
+    @override_settings(STORE_CART_STORAGE={'ENGINE': 'cache'})
+    def test_cached_cart_keeps_every_line(self):
+        cart = self.add_concurrently(same_product=False)
+        self.assertEqual(sorted(item['quantity'] for item in cart['items']), [self.ADDS] * self.THREADS)
+        self.assertEqual(
+            dict(InventoryHold.objects.values_list('product_id', 'quantity')),
+            {product.id: self.ADDS for product in self.products})
@@ -0,0 +1,45 @@
+from .base import StoreTestCase, make_product
+
+
+class ConditionalGetTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_product(self.collection, 'hammer')
+
+    def test_unchanged_lists_are_not_modified(self):
+        etag = self.client.get('/store/products/')['ETag']
+        response = self.client.get('/store/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertNotEqual(
+            self.client.get(f'/store/products/?collection_id={self.collection.id}')['ETag'], etag)
+
+        make_product(self.collection, 'saw')
+        self.assertEqual(self.client.get('/store/products/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deletes_change_the_list_etag(self):
+        saw = make_product(self.collection, 'saw')
+        etag = self.client.get('/store/products/')['ETag']
+        saw.delete()
+        self.assertEqual(self.client.get('/store/products/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_details_send_last_modified(self):
+        url = f'/store/products/{self.hammer.id}/'
+        response = self.client.get(url)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.hammer.title = 'Sledgehammer'
+        self.hammer.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.client.get('/store/products/0/').status_code, 404)
+
+    def test_collections_follow_the_catalog_version(self):
+        url = f'/store/collections/{self.collection.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_product(self.collection, 'saw')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.json()['products_count']), (200, 2))
@@ -0,0 +1,97 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from store.caching import CATALOG, get_version
+from store.models import Collection, Customer, Order, OrderItem
+from .base import StoreTestCase, make_customer, make_product
+
+
+class CollectionCounterTests(StoreTestCase):
+    def assertCollectionCounts(self, expected):
+        counts = dict(Collection.objects.values_list('id', 'products_count'))
+        self.assertEqual({collection.id: counts[collection.id] for collection in expected},
+                         {collection.id: count for collection, count in expected.items()})
+        self.assertFalse(Collection.objects.drifted().exists())
+
+    def test_products_count_follows_products(self):
+        other = Collection.objects.create(title='Garden')
+        hammer = make_product(self.collection, 'hammer')
+        make_product(self.collection, 'saw')
+        self.assertCollectionCounts({self.collection: 2, other: 0})
+
+        hammer.collection = other
+        hammer.save()
+        self.assertCollectionCounts({self.collection: 1, other: 1})
+
+        hammer.delete()
+        self.assertCollectionCounts({self.collection: 1, other: 0})
+
+    def test_bulk_delete_counts_once_per_collection(self):
+        other = Collection.objects.create(title='Garden')
+        products = [make_product(collection, f'{collection.id}-{index}')
+                    for collection in (self.collection, other) for index in range(3)]
+        self.login_admin()
+
+        response = self.client.post(
+            '/store/products/bulk-delete/', {'ids': [p.id for p in products[1:]]}, format='json')
+
+        self.assertEqual(response.json()['deleted'], 5)
+        self.assertCollectionCounts({self.collection: 1, other: 0})
+
+    def test_recount_repairs_drift_and_drops_cached_counts(self):
+        make_product(self.collection, 'hammer')
+        Collection.objects.filter(id=self.collection.id).update(products_count=7)
+        url = f'/store/collections/{self.collection.id}/'
+        etag = self.client.get(url)['ETag']
+        version = get_version(CATALOG)
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recount', stdout=out)
+
+        self.assertIn('products of 1 drifted collection(s)', out.getvalue())
+        self.assertCollectionCounts({self.collection: 1})
+        self.assertNotEqual(get_version(CATALOG), version)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.json()['products_count']), (200, 1))
+
+
+class OrderCounterTests(StoreTestCase):
+    def test_order_counters(self):
+        customer = make_customer()
+        product = make_product(self.collection, 'hammer')
+        order = Order.objects.create(customer=customer)
+        OrderItem.objects.create(order=order, product=product, quantity=2, unit_price=Decimal('2.50'))
+        item = OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=Decimal('4'))
+
+        order.refresh_from_db()
+        customer.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (Decimal('9.00'), 3))
+        self.assertEqual(customer.orders_count, 1)
+
+        item.delete()
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (Decimal('5.00'), 2))
+        self.assertFalse(Order.objects.drifted().exists())
+
+        OrderItem.objects.filter(order=order).delete()
+        order.delete()
+        customer.refresh_from_db()
+        self.assertEqual(customer.orders_count, 0)
+        self.assertFalse(Customer.objects.drifted().exists())
+
+    def test_recount_repairs_order_totals(self):
+        customer = make_customer()
+        order = Order.objects.create(customer=customer)
+        OrderItem.objects.create(
+            order=order, product=make_product(self.collection, 'hammer'), quantity=2, unit_price=Decimal('3'))
+        Order.objects.update(total=0, item_count=0)
+        Customer.objects.update(orders_count=5)
+
+        out = StringIO()
+        call_command('recount', stdout=out)
+
+        self.assertIn('orders of 1 customer(s) and totals of 1 order(s)', out.getvalue())
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (Decimal('6.00'), 2))
+        self.assertFalse(Customer.objects.drifted().exists())
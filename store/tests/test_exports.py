@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+from django.contrib.contenttypes.models import ContentType
+from store.exports import FIELDS
+from store.models import Product, Promotion
+from tags.models import Tag, TaggedItem
+from .base import StoreTestCase, make_product
+
+
+class ExportTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_product(self.collection, 'hammer', title='Hammer')
+        self.hammer.promotions.add(Promotion.objects.create(description='Spring', discount=0.1))
+        TaggedItem.objects.create(
+            tag=Tag.objects.create(label='steel'), object_id=self.hammer.id,
+            content_type=ContentType.objects.get_for_model(Product))
+        self.saw = make_product(self.collection, 'saw', title='Saw')
+
+    def export(self, query=''):
+        response = self.client.get(f'/store/products/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_admins_only(self):
+        self.assertEqual(self.client.get('/store/products/export/').status_code, 401)
+
+    def test_ndjson(self):
+        self.login_admin()
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([row['slug'] for row in rows], ['hammer', 'saw'])
+        self.assertEqual(set(rows[0]), set(FIELDS))
+        self.assertEqual((rows[0]['collection'], rows[0]['promotions'], rows[0]['tags']),
+                         ('Tools', ['Spring'], ['steel']))
+        self.assertEqual((rows[1]['promotions'], rows[1]['reviews_count']), ([], 0))
+
+    def test_csv_keeps_the_filters(self):
+        self.login_admin()
+        rows = list(csv.DictReader(io.StringIO(self.export('?file_type=csv&search=hammer'))))
+        self.assertEqual([(row['slug'], row['promotions'], row['tags']) for row in rows],
+                         [('hammer', 'Spring', 'steel')])
+
+    def test_unknown_format(self):
+        self.login_admin()
+        self.assertEqual(self.client.get('/store/products/export/?file_type=xml').status_code, 400)
@@ -0,0 +1,53 @@
+import io
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+from store.importers import ProductImporter, read_rows
+from store.models import Product
+from .base import StoreTestCase, make_product
+
+
+class ImporterTests(StoreTestCase):
+    FEED = (
+        'title,slug,description,unit_price,inventory,collection\n'
+        'Hammer,hammer,Claw hammer,12.50,4,Tools\n'
+        'Saw,saw,,30,2,Tools\n'
+        'Rake,rake,,0,1,Tools\n'
+        'Hose,hose,,9,1,Garden\n'
+    )
+
+    def test_rows_are_upserted_by_slug(self):
+        make_product(self.collection, 'hammer', title='Old hammer', unit_price=5)
+
+        report = ProductImporter(batch_size=2).run(read_rows(io.StringIO(self.FEED), 'csv'))
+
+        self.assertEqual((report['rows'], report['imported'], report['rejected']), (4, 2, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4])
+        hammer = Product.objects.get(slug='hammer')
+        self.assertEqual((hammer.title, hammer.unit_price, hammer.inventory),
+                         ('Hammer', Decimal('12.50'), 4))
+        self.assertEqual(Product.objects.count(), 2)
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.products_count, 2)
+
+    def test_bad_ndjson_lines_are_rejected(self):
+        feed = io.StringIO(
+            '{"title": "Saw", "slug": "saw", "unit_price": "30", "inventory": 2, "collection": "Tools"}\n'
+            '\n'
+            '{"title": \n'
+            '[1, 2]\n'
+        )
+        report = ProductImporter().run(read_rows(feed, 'ndjson'))
+        self.assertEqual((report['rows'], report['imported'], report['rejected']), (3, 1, 2))
+
+    def test_upload(self):
+        def upload(name, query=''):
+            return self.client.post(
+                f'/store/products/import/{query}',
+                {'file': SimpleUploadedFile(name, self.FEED.encode())}, format='multipart')
+
+        self.assertEqual(upload('feed.csv').status_code, 401)
+        self.login_admin()
+        self.assertEqual(upload('feed.txt').status_code, 400)
+        response = upload('feed.txt', '?file_type=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['imported'], 2)
@@ -0,0 +1,50 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+from store.models import InventoryHold, ProductStock
+from .base import StoreTestCase, make_product, reserved
+
+
+class InventoryHoldTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_product(self.collection, 'hammer', inventory=5)
+
+    def add(self, cart_id, quantity):
+        return self.client.post(
+            f'/store/carts/{cart_id}/items/', {'product_id': self.hammer.id, 'quantity': quantity})
+
+    def test_lines_hold_their_units(self):
+        first = self.create_cart([(self.hammer, 3)])
+        second = self.create_cart()
+        response = self.add(second, 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient inventory', str(response.json()))
+        self.assertEqual(self.add(second, 2).status_code, 201)
+        self.assertEqual(reserved(self.hammer), 5)
+
+        item = self.client.get(f'/store/carts/{first}/items/').json()['results'][0]
+        self.client.patch(f'/store/carts/{first}/items/{item["id"]}/', {'quantity': 1})
+        self.assertEqual(reserved(self.hammer), 3)
+        self.client.delete(f'/store/carts/{first}/items/{item["id"]}/')
+        self.client.delete(f'/store/carts/{second}/')
+        self.assertEqual(reserved(self.hammer), 0)
+        self.assertFalse(InventoryHold.objects.exists())
+
+    def test_expired_holds_are_swept(self):
+        abandoned = self.create_cart([(self.hammer, 4)])
+        live = self.create_cart([(self.hammer, 1)])
+        InventoryHold.objects.filter(cart_id=abandoned).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command('sweep_holds', batch_size=1, stdout=out)
+        self.assertIn('Released 1 expired hold(s)', out.getvalue())
+        self.assertEqual(reserved(self.hammer), 1)
+        self.assertEqual(self.add(live, 4).status_code, 201)
+
+    def test_rebuild_recomputes_reserved_stock(self):
+        self.create_cart([(self.hammer, 2)])
+        ProductStock.objects.update(reserved=5)
+        call_command('sweep_holds', rebuild=True, stdout=StringIO())
+        self.assertEqual(reserved(self.hammer), 2)
@@ -0,0 +1,62 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import Client, override_settings
+from store import jobs
+from store.models import AdminJob, AdminJobChunk, Product
+from .base import StoreTestCase, make_product, make_user
+
+
+@override_settings(STORE_ADMIN_JOB_CHUNK_SIZE=2)
+class AdminJobTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            make_product(self.collection, f'product-{index}', unit_price=10)
+
+    def prices(self):
+        return sorted(Product.objects.values_list('unit_price', flat=True))
+
+    def test_jobs_run_chunk_by_chunk(self):
+        job = jobs.enqueue('adjust_prices', Product.objects.all(), {'percent': '12.5'})
+        self.assertEqual((job.total, job.chunks.count()), (5, 3))
+
+        self.assertEqual(jobs.run_next().status, AdminJob.STATUS_RUNNING)
+        out = StringIO()
+        call_command('run_admin_jobs', stdout=out)
+        self.assertIn('Ran 2 chunk(s)', out.getvalue())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.changed, job.failed), (AdminJob.STATUS_DONE, 5, 5, 0))
+        self.assertEqual(self.prices(), [Decimal('11.25')] * 5)
+        self.assertIsNone(jobs.run_next())
+
+    def test_failing_chunks_change_nothing(self):
+        job = jobs.enqueue('adjust_prices', Product.objects.all(), {'percent': 'ten'})
+        call_command('run_admin_jobs', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.failed), (AdminJob.STATUS_FAILED, 5))
+        self.assertIn('InvalidOperation', job.chunks.first().error)
+        self.assertEqual(self.prices(), [Decimal('10.00')] * 5)
+
+    def test_empty_selections_are_done(self):
+        job = jobs.enqueue('clear_inventory', Product.objects.none())
+        self.assertEqual(job.status, AdminJob.STATUS_DONE)
+
+    def test_admin_actions_queue_jobs(self):
+        user = make_user('admin', is_staff=True, is_superuser=True)
+        client = Client()
+        client.force_login(user)
+
+        response = client.post('/admin/store/product/', {
+            'action': 'clear_inventory',
+            '_selected_action': list(Product.objects.values_list('id', flat=True)[:3]),
+        }, follow=True)
+
+        self.assertContains(response, 'was queued for 3 products')
+        job = AdminJob.objects.get()
+        self.assertEqual((job.user, job.status), (user, AdminJob.STATUS_PENDING))
+        self.assertFalse(Product.objects.filter(inventory=0).exists())
+        call_command('run_admin_jobs', stdout=StringIO())
+        self.assertEqual(Product.objects.filter(inventory=0).count(), 3)
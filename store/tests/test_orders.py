@@ -0,0 +1,118 @@
+from decimal import Decimal
+from store.models import Cart, CartItem, Customer, InventoryHold, Order, OrderItem
+from .base import StoreTestCase, make_customer, make_product, make_user, reserved
+
+
+class CheckoutTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.customer = make_customer(user=self.user)
+        self.client.force_authenticate(self.user)
+        self.hammer = make_product(self.collection, 'hammer', unit_price=10, inventory=5)
+        self.saw = make_product(self.collection, 'saw', unit_price=25, inventory=5)
+
+    def checkout(self, cart_id, **data):
+        return self.client.post(f'/store/carts/{cart_id}/checkout/', data, format='json')
+
+    def test_checkout_places_the_order(self):
+        cart_id = self.create_cart([(self.hammer, 2), (self.saw, 1)])
+
+        response = self.checkout(cart_id)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        order = Order.objects.get()
+        self.assertEqual((order.customer, order.total, order.item_count), (self.customer, Decimal('45.00'), 3))
+        self.assertEqual(response.json()['item_count'], 3)
+        self.hammer.refresh_from_db()
+        self.assertEqual(self.hammer.inventory, 3)
+        self.assertEqual(reserved(self.hammer), 0)
+        self.assertFalse(Cart.objects.filter(pk=cart_id).exists())
+        self.assertFalse(InventoryHold.objects.exists())
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.orders_count, 1)
+
+    def test_orders_go_to_the_users_customer(self):
+        other = make_customer('other@example.com')
+        cart_id = self.create_cart([(self.hammer, 1)])
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.checkout(cart_id).status_code, 401)
+        self.client.force_authenticate(make_user('stranger'))
+        self.assertEqual(self.checkout(cart_id).status_code, 400)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.checkout(cart_id, customer_id=other.id).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+        self.client.force_authenticate(make_user('clerk', is_staff=True))
+        self.assertEqual(self.checkout(cart_id, customer_id=10**6).status_code, 400)
+        self.assertEqual(self.checkout(cart_id, customer_id=other.id).status_code, 201)
+        self.assertEqual(Order.objects.get().customer, other)
+
+    def test_new_customers_belong_to_the_user(self):
+        user = make_user('newcomer')
+        self.client.force_authenticate(user)
+        data = {'first_name': 'Grace', 'last_name': 'Hopper', 'email': 'grace@example.com', 'phone': '2'}
+        response = self.client.post('/store/customers/', data)
+        self.assertEqual(response.json()['user_id'], user.id)
+        response = self.client.post('/store/customers/', {**data, 'email': 'grace2@example.com'})
+        self.assertIsNone(response.json()['user_id'])
+        self.assertEqual(Customer.objects.get(user=user).email, 'grace@example.com')
+
+    def test_units_held_by_other_carts_are_not_sold(self):
+        holder = self.create_cart([(self.hammer, 3)])
+        buyer = self.create_cart([(self.hammer, 2)])
+        # A line grown past its hold, as a stale cart would be
+        CartItem.objects.filter(cart_id=buyer).update(quantity=3)
+
+        response = self.checkout(buyer)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['products'], [self.hammer.id])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(reserved(self.hammer), 5)
+
+        self.assertEqual(self.checkout(holder).status_code, 201)
+        self.hammer.refresh_from_db()
+        self.assertEqual((self.hammer.inventory, reserved(self.hammer)), (2, 2))
+
+    def test_empty_and_missing_carts(self):
+        self.assertEqual(self.checkout(self.create_cart()).status_code, 400)
+        self.assertEqual(self.checkout('8b0c8d5e-0000-4000-8000-000000000000').status_code, 404)
+
+
+class OrderEndpointTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = make_customer()
+        product = make_product(self.collection, 'hammer', unit_price=10)
+        self.orders = []
+        for quantity in range(1, 8):
+            order = Order.objects.create(customer=self.customer)
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, unit_price=product.unit_price)
+            self.orders.append(order)
+        Order.objects.create(customer=make_customer('other@example.com'))
+
+    def test_admins_only(self):
+        urls = [f'/store/orders/{self.orders[0].id}/', f'/store/customers/{self.customer.id}/orders/']
+        self.assertEqual([self.client.get(url).status_code for url in urls], [401, 401])
+        self.client.force_authenticate(make_user())
+        self.assertEqual([self.client.get(url).status_code for url in urls], [403, 403])
+
+    def test_order_detail(self):
+        self.login_admin()
+        order = self.client.get(f'/store/orders/{self.orders[2].id}/').json()
+        self.assertEqual((order['total'], order['item_count'], len(order['items'])), (30.0, 3, 1))
+
+    def test_history_pages_newest_first(self):
+        self.login_admin()
+        url = f'/store/customers/{self.customer.id}/orders/?page_size=3'
+        seen = []
+        while url:
+            page = self.client.get(url).json()
+            seen += [order['id'] for order in page['results']]
+            url = page['next']
+        self.assertEqual(seen, [order.id for order in reversed(self.orders)])
+        other = Order.objects.exclude(customer=self.customer).get()
+        self.assertEqual(
+            self.client.get(f'/store/customers/{self.customer.id}/orders/{other.id}/').status_code, 404)
@@ -0,0 +1,57 @@
+from base64 import urlsafe_b64encode
+from store.models import Review
+from .base import StoreTestCase, make_product
+
+
+def encode_cursor(key):
+    return urlsafe_b64encode(f'{{"k":{key}}}'.encode()).decode()
+
+
+class KeysetPaginationTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        # Repeated titles, so pages are told apart by id
+        self.products = [
+            make_product(self.collection, f'product-{index}', title=f'Title {index % 3}')
+            for index in range(12)
+        ]
+
+    def test_pages_follow_the_keyset_ordering(self):
+        url = '/store/products/?paginate=cursor&page_size=5'
+        seen = []
+        while url:
+            page = self.client.get(url).json()
+            seen += [(product['title'], product['id']) for product in page['results']]
+            last, url = page, page['next']
+
+        self.assertEqual(seen, sorted((p.title, p.id) for p in self.products))
+        previous = self.client.get(last['previous']).json()
+        self.assertEqual([(p['title'], p['id']) for p in previous['results']], seen[5:10])
+
+    def test_page_numbers_stay_the_default(self):
+        page = self.client.get('/store/products/?page=2').json()
+        self.assertEqual(page['count'], 12)
+
+    def test_descending_datetime_keys(self):
+        product = self.products[0]
+        for index in range(5):
+            Review.objects.create(product=product, name=f'Reviewer {index}', description='-', rating=5)
+        url = f'/store/products/{product.id}/reviews/?paginate=cursor&page_size=2'
+        seen = []
+        while url:
+            page = self.client.get(url).json()
+            seen += [review['id'] for review in page['results']]
+            url = page['next']
+        expected = Review.objects.order_by('-created_at', 'id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_invalid_cursors_are_not_found(self):
+        for cursor in ['bad', encode_cursor('["Title 1"]'), encode_cursor('["Title 1", "x"]'),
+                       encode_cursor('[null, 1]')]:
+            response = self.client.get(f'/store/products/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, cursor)
+
+    def test_reordering_is_rejected(self):
+        response = self.client.get('/store/products/?paginate=cursor&ordering=unit_price')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
@@ -0,0 +1,43 @@
+from decimal import Decimal
+from store import pricing
+from store.models import Order, Promotion
+from .base import StoreTestCase, make_customer, make_product, make_user
+
+
+class PromotionPricingTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_product(self.collection, 'hammer', unit_price='19.99')
+        self.saw = make_product(self.collection, 'saw', unit_price=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hammer.promotions.add(
+                Promotion.objects.create(description='Spring', discount=0.1),
+                Promotion.objects.create(description='Clearance', discount=0.15))
+
+    def test_best_discount_rounded_per_unit(self):
+        quote = pricing.quote([(self.hammer.id, 3, self.hammer.unit_price), (self.saw.id, 1, self.saw.unit_price)])
+        self.assertEqual(quote.lines[self.hammer.id].price, Decimal('16.99'))
+        self.assertEqual((quote.subtotal, quote.discount, quote.total),
+                         (Decimal('89.97'), Decimal('9.00'), Decimal('80.97')))
+
+    def test_promotion_changes_reprice_carts(self):
+        cart_id = self.create_cart([(self.hammer, 1)])
+        self.assertEqual(self.client.get(f'/store/carts/{cart_id}/').json()['total_price'], 16.99)
+        with self.captureOnCommitCallbacks(execute=True):
+            Promotion.objects.filter(description='Clearance').delete()
+        self.assertEqual(self.client.get(f'/store/carts/{cart_id}/').json()['total_price'], 17.99)
+
+    def test_orders_keep_the_promoted_prices(self):
+        user = make_user()
+        make_customer(user=user)
+        cart_id = self.create_cart([(self.hammer, 3), (self.saw, 1)])
+        self.client.force_authenticate(user)
+
+        response = self.client.post(f'/store/carts/{cart_id}/checkout/')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        order = Order.objects.get()
+        self.assertEqual(order.total, Decimal('80.97'))
+        self.assertEqual(
+            dict(order.orderitem_set.values_list('product_id', 'unit_price')),
+            {self.hammer.id: Decimal('16.99'), self.saw.id: Decimal('30.00')})
@@ -0,0 +1,61 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from store.models import CartItem, Order, OrderItem, Product
+from store.serializers import ProductSerializer
+from .base import StoreTestCase, make_customer, make_product
+
+
+class ProductRepresentationTests(StoreTestCase):
+    def test_listing_prices_and_links(self):
+        make_product(self.collection, 'hammer', unit_price='19.99')
+        product = self.client.get('/store/products/').json()['results'][0]
+        self.assertEqual(product['price_with_tax'], 21.99)
+        self.assertEqual(product['collection'], f'http://testserver/store/collections/{self.collection.id}/')
+
+    def test_bare_instances_compute_the_price(self):
+        product = make_product(self.collection, 'hammer', unit_price='19.99')
+        data = ProductSerializer(product, context={'request': None}).data
+        self.assertEqual(data['price_with_tax'], Decimal('21.99'))
+
+    def test_benchmark_runs(self):
+        out = StringIO()
+        call_command('bench_product_serializer', rows=10, repeat=1, stdout=out)
+        self.assertIn('faster per row', out.getvalue())
+
+
+class ProductDeleteTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ordered = make_product(self.collection, 'ordered')
+        order = Order.objects.create(customer=make_customer())
+        OrderItem.objects.create(order=order, product=self.ordered, quantity=1, unit_price=self.ordered.unit_price)
+        self.in_cart = make_product(self.collection, 'in-cart')
+        self.create_cart([(self.in_cart, 1)])
+        self.free = make_product(self.collection, 'free')
+
+    def test_referenced_products_are_kept(self):
+        for product, error in [(self.ordered, 'Product has associated orders'),
+                               (self.in_cart, 'Product is in a cart')]:
+            response = self.client.delete(f'/store/products/{product.id}/')
+            self.assertEqual(response.status_code, 405)
+            self.assertEqual(response.json(), {'error': error})
+        self.assertTrue(CartItem.objects.filter(product=self.in_cart).exists())
+
+        self.assertEqual(self.client.delete(f'/store/products/{self.free.id}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/store/products/{self.free.id}/').status_code, 404)
+
+    def test_bulk_delete_reports_every_id(self):
+        ids = [self.ordered.id, self.in_cart.id, self.free.id, 10**6]
+        self.assertEqual(
+            self.client.post('/store/products/bulk-delete/', {'ids': ids}, format='json').status_code, 401)
+
+        self.login_admin()
+        response = self.client.post('/store/products/bulk-delete/', {'ids': ids}, format='json')
+        self.assertEqual(response.json(), {'deleted': 1, 'results': [
+            {'id': self.ordered.id, 'status': 'referenced', 'error': 'Product has associated orders'},
+            {'id': self.in_cart.id, 'status': 'referenced', 'error': 'Product is in a cart'},
+            {'id': self.free.id, 'status': 'deleted'},
+            {'id': 10**6, 'status': 'not_found'},
+        ]})
+        self.assertEqual(set(Product.objects.values_list('id', flat=True)), {self.ordered.id, self.in_cart.id})
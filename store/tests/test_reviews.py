@@ -0,0 +1,53 @@
+from io import StringIO
+from django.core.management import call_command
+from store.models import Product, Review, ReviewSummary
+from .base import StoreTestCase, make_product
+
+
+class ReviewSummaryTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(self.collection, 'hammer')
+        self.url = f'/store/products/{self.product.id}/reviews/'
+
+    def review(self, rating):
+        response = self.client.post(self.url, {'name': 'Ada', 'description': '-', 'rating': rating})
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def summary(self):
+        return self.client.get(f'{self.url}summary/').json()
+
+    def test_summary_follows_review_writes(self):
+        self.assertEqual(self.summary(), {
+            'count': 0, 'average': None, 'histogram': {str(rating): 0 for rating in range(1, 6)}})
+
+        first = self.review(5)
+        self.review(2)
+        self.client.patch(f'{self.url}{first}/', {'rating': 4})
+        summary = self.summary()
+        self.assertEqual((summary['count'], summary['average']), (2, 3.0))
+        self.assertEqual(summary['histogram'], {'1': 0, '2': 1, '3': 0, '4': 1, '5': 0})
+
+        self.client.delete(f'{self.url}{first}/')
+        self.assertEqual(self.summary()['count'], 1)
+        product = self.client.get(f'/store/products/{self.product.id}/').json()
+        self.assertEqual(product['rating']['count'], 1)
+
+    def test_review_writes_move_the_product_validators(self):
+        etag = self.client.get(f'/store/products/{self.product.id}/')['ETag']
+        self.review(5)
+        response = self.client.get(f'/store/products/{self.product.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_rebuild_repairs_summaries(self):
+        self.review(5)
+        Review.objects.create(product=self.product, name='Bob', description='-', rating=1)
+        ReviewSummary.objects.create(product=make_product(self.collection, 'saw'), count=3)
+        last_update = Product.objects.get(id=self.product.id).last_update
+
+        call_command('rebuild_review_summaries', stdout=StringIO())
+
+        self.assertEqual(self.summary()['count'], 2)
+        self.assertEqual(list(ReviewSummary.objects.values_list('product_id', flat=True)), [self.product.id])
+        self.assertGreater(Product.objects.get(id=self.product.id).last_update, last_update)
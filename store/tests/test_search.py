@@ -0,0 +1,39 @@
+from unittest import mock
+from django.db import connection
+from .base import StoreTestCase, make_product
+
+
+class ProductSearchTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.claw = make_product(self.collection, 'claw-hammer', title='Claw hammer')
+        self.mallet = make_product(self.collection, 'mallet', title='Mallet')
+        self.mallet.description = 'Rubber head, lighter than a hammer'
+        self.mallet.save()
+        make_product(self.collection, 'saw', title='Saw')
+
+    def search(self, text):
+        response = self.client.get('/store/products/', {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return [product['id'] for product in response.json()['results']]
+
+    def test_terms_match_as_prefixes(self):
+        self.assertEqual(self.search('ham'), [self.claw.id, self.mallet.id])
+        self.assertEqual(self.search('claw ham'), [self.claw.id])
+        self.assertEqual(self.search('drill'), [])
+
+    def test_title_matches_rank_first(self):
+        self.claw.title = 'Claw'
+        self.claw.description = 'Hammer hammer hammer'
+        self.claw.save()
+        self.assertEqual(self.search('hammer')[0], self.claw.id)
+
+    def test_writes_are_indexed(self):
+        make_product(self.collection, 'drill', title='Cordless drill')
+        self.assertEqual(len(self.search('cordless')), 1)
+        self.mallet.delete()
+        self.assertEqual(self.search('rubber'), [])
+
+    def test_other_databases_use_search_fields(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertEqual(sorted(self.search('hammer')), [self.claw.id, self.mallet.id])
@@ -9,6 +9,8 @@ router.register('products', views.ProductViewSet, basename='product')
 router.register('collections', views.CollectionViewSet, basename='collection')
 router.register('carts', views.CartViewSet, basename='cart')
 router.register('customers', views.CustomerViewSet, basename='customer')
+router.register('orders', views.OrderViewSet, basename='order')
+router.register('reports/sales', views.SalesReportViewSet, basename='sales-report')
 
 # Nested router for products under collections
 # Example: /collections/{collection_pk}/products/
@@ -16,7 +18,7 @@ collections_router = routers.NestedDefaultRouter(router, 'collections', lookup='
 collections_router.register('products', views.ProductViewSet, basename='collection-products')
 
 # Nested router for reviews under products
-# Example: /products/{product_pk}/reviews/
+# Example: /products/{product_id}/reviews/ (ProductViewSet looks up on 'id')
 products_router = routers.NestedDefaultRouter(router, 'products', lookup='product')
 products_router.register('reviews', views.ReviewViewSet, basename='product-reviews')
 
@@ -25,9 +27,15 @@ products_router.register('reviews', views.ReviewViewSet, basename='product-revie
 carts_router = routers.NestedDefaultRouter(router, 'carts', lookup='cart')
 carts_router.register('items', views.CartItemViewSet, basename='cart-items')
 
+# Nested router for order history under customers
+# Example: /customers/{customer_pk}/orders/
+customers_router = routers.NestedDefaultRouter(router, 'customers', lookup='customer')
+customers_router.register('orders', views.CustomerOrderViewSet, basename='customer-orders')
+
 urlpatterns = [
     path('', include(router.urls)),
     path('', include(collections_router.urls)),
     path('', include(products_router.urls)),
     path('', include(carts_router.urls)),
+    path('', include(customers_router.urls)),
 ]
\ No newline at end of file
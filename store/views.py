@@ -1,31 +1,49 @@
-from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse
+from django.shortcuts import render
+from rest_framework.generics import get_object_or_404
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view, action
 from rest_framework.views import APIView
-from rest_framework.mixins import ListModelMixin, CreateModelMixin
+from rest_framework.mixins import ListModelMixin, CreateModelMixin, RetrieveModelMixin
 # from rest_framework.generics import GenericAPIView, ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.pagination import PageNumberPagination
-from .models import Product, Collection, Review, Cart, CartItem, Customer
-from .serializers import ProductSerializer, CollectionSerializer, ReviewSerializer, CartSerializer, CartItemSerializer, CustomerSerializer
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from .models import Product, Collection, Review, ReviewSummary, Cart, CartItem, Customer, DailySales, Order
+from .serializers import ProductSerializer, ProductBulkDeleteSerializer, CollectionSerializer, ReviewSerializer, ReviewSummarySerializer, CartSerializer, CartSummarySerializer, CartItemSerializer, CartItemBatchSerializer, CartMergeSerializer, CheckoutSerializer, CustomerSerializer, OrderSerializer, SalesDaySerializer, SalesProductSerializer, SalesCollectionSerializer
+from .caching import CATALOG, CachedResponseMixin
+from .conditional import ConditionalGetMixin
+from .pagination import KeysetPaginationMixin
+from .search import ProductSearchFilter
+from .filters import CartFilter, SalesFilter
+from .importers import FORMATS, ProductImporter, decode_lines, detect_format, read_rows
+from . import exports
+from .reviews import record_review
+from . import carts, inventory, orders, pricing
+from .signals import deleting_products
  
-from django.db.models import Count
+from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.db.models import ProtectedError, Sum
 from rest_framework.response import Response
 from rest_framework import status
 # Create your views here.
 
 
 
-class ProductViewSet(ModelViewSet):
-    queryset = Product.objects.all()
+class ProductViewSet(ConditionalGetMixin, CachedResponseMixin, KeysetPaginationMixin, ModelViewSet):
+    queryset = Product.objects.with_price_with_tax().select_related('review_summary')
     serializer_class = ProductSerializer
     lookup_field = 'id'
+    last_modified_field = 'last_update'
+    keyset_ordering = ('title', 'id')
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_fields = ['collection_id']
  
+    # Only used on databases without a full-text index, see store.search
     search_fields = ['title', 'description']
     ordering_fields = ['unit_price', 'last_updated']
 
@@ -40,18 +58,122 @@ class ProductViewSet(ModelViewSet):
     def get_serializer_context(self):
         return {'request': self.request}
     
-    def delete(self, request, id):
-        product = get_object_or_404(Product, pk=id)
-        if product.orders_count > 0:
+    @staticmethod
+    def reference_error(product):
+        """Why a product with `with_references()` flags cannot be deleted, if it cannot."""
+        if product['has_orders']:
+            return 'Product has associated orders'
+        if product['in_carts']:
+            return 'Product is in a cart'
+        return None
+
+    def destroy(self, request, *args, **kwargs):
+        # Cart lines would cascade away with the product, so they keep it too
+        with transaction.atomic():
+            product = get_object_or_404(
+                Product.objects.with_references().values('id', 'has_orders', 'in_carts'),
+                id=kwargs['id'])
+            error = self.reference_error(product)
+            if error is not None:
+                return Response({'error': error}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            try:
+                Product.objects.filter(id=product['id']).delete()
+            except ProtectedError:
+                return Response(
+                    {'error': 'Product was ordered while being deleted, please retry'},
+                    status=status.HTTP_409_CONFLICT
+                )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete', permission_classes=[IsAdminUser])
+    def bulk_delete(self, request):
+        """
+        Delete many products at once.
+
+        Body: {"ids": [1, 2, 3]}. Products referenced by an order or a cart
+        are kept; the rest are removed in one DELETE. Every id gets a status
+        of deleted, referenced or not_found.
+        """
+        serializer = ProductBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+
+        with transaction.atomic():
+            references = {
+                row['id']: row
+                for row in Product.objects
+                .filter(id__in=ids)
+                .with_references()
+                .values('id', 'has_orders', 'in_carts')
+            }
+            deletable = [
+                id for id, row in references.items()
+                if self.reference_error(row) is None
+            ]
+            try:
+                with deleting_products():
+                    Product.objects.filter(id__in=deletable).delete()
+            except ProtectedError:
+                return Response(
+                    {'error': 'Products were ordered while being deleted, please retry'},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+        results = []
+        for id in ids:
+            row = references.get(id)
+            if row is None:
+                results.append({'id': id, 'status': 'not_found'})
+            elif self.reference_error(row) is not None:
+                results.append({'id': id, 'status': 'referenced', 'error': self.reference_error(row)})
+            else:
+                results.append({'id': id, 'status': 'deleted'})
+
+        return Response({'deleted': len(deletable), 'results': results})
+
+    @action(detail=False, methods=['post'], url_path='import',
+            permission_classes=[IsAdminUser], parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Upsert products by slug from an uploaded CSV or NDJSON feed.
+
+        The feed is sent as the multipart field "file"; the format comes from
+        its extension or the ?file_type= parameter.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_type = request.query_params.get('file_type') or detect_format(upload.name)
+        if file_type not in FORMATS:
             return Response(
-                {'error': 'Cannot delete product with associated orders'},
-                status=status.HTTP_405_METHOD_NOT_ALLOWED
+                {'error': f'Unsupported file type, expected one of: {", ".join(FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        product.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
-    
 
+        report = ProductImporter().run(read_rows(decode_lines(upload), file_type))
+        return Response(report)
     
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        """
+        Stream the whole (filtered) catalog as NDJSON or, with ?file_type=csv, CSV.
+        """
+        file_type = request.query_params.get('file_type', 'ndjson')
+        if file_type not in exports.FORMATS:
+            return Response(
+                {'error': f'Unsupported file type, expected one of: {", ".join(exports.FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.filter_queryset(Product.objects.all())
+        response = StreamingHttpResponse(
+            exports.stream_products(file_type, queryset),
+            content_type=exports.FORMATS[file_type]
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{file_type}"'
+        return response
+
 
 # class ProductList(ListCreateAPIView) :
 
@@ -81,13 +203,15 @@ class ProductViewSet(ModelViewSet):
     #     product.delete()
     #     return Response(status=status.HTTP_204_NO_CONTENT)
 
-class CollectionViewSet(ModelViewSet):
-    queryset = Collection.objects.annotate(products_count=Count('product')).all()
+class CollectionViewSet(ConditionalGetMixin, ModelViewSet):
+    queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     lookup_field = 'pk'
+    # Collections have no timestamp, and products_count moves with products
+    etag_namespace = CATALOG
 
-    def delete(self, request, pk):
-        collection = get_object_or_404(Collection.objects.annotate(products_count=Count('product')), pk=pk)
+    def destroy(self, request, *args, **kwargs):
+        collection = get_object_or_404(Collection, pk=kwargs['pk'])
         if collection.products_count > 0:
             return Response(
                 {'error': 'Cannot delete collection with associated products'},
@@ -97,14 +221,40 @@ class CollectionViewSet(ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(KeysetPaginationMixin, ModelViewSet):
     serializer_class = ReviewSerializer
+    keyset_ordering = ('-created_at', 'id')
 
     def get_queryset(self):
-        return Review.objects.filter(product_id=self.kwargs['product_pk'])
+        return Review.objects.filter(product_id=self.kwargs['product_id'])
     
     def get_serializer_context(self):
-        return {'product_id': self.kwargs['product_pk']}
+        return {'product_id': self.kwargs['product_id']}
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        review = serializer.save()
+        record_review(review.product_id, added=review.rating)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous_rating = serializer.instance.rating
+        review = serializer.save()
+        record_review(review.product_id, added=review.rating, removed=previous_rating)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        record_review(instance.product_id, removed=instance.rating)
+        instance.delete()
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request, *args, **kwargs):
+        """Review count, average rating and 1-5 histogram of the product"""
+        product = get_object_or_404(
+            Product.objects.select_related('review_summary'), id=self.kwargs['product_id'])
+        serializer = ReviewSummarySerializer(
+            getattr(product, 'review_summary', None) or ReviewSummary())
+        return Response(serializer.data)
 
 
 # class CollectionList(ListCreateAPIView):
@@ -138,29 +288,179 @@ class ReviewViewSet(ModelViewSet):
 #     return Response(serializer.data)
 
 
-class CartViewSet(ModelViewSet):
+class CartStorageMixin:
+    """
+    Serve carts from the cache-backed store when STORE_CART_STORAGE selects it.
+    """
+
+    def get_cart_store(self):
+        if not hasattr(self, '_cart_store'):
+            self._cart_store = carts.CacheCartStore() if carts.is_cached() else None
+        return self._cart_store
+
+    def get_cart_state(self, cart_id):
+        state = self.get_cart_store().load(cart_id)
+        if state is None:
+            raise Http404('No Cart matches the given query.')
+        return state
+
+
+class CartViewSet(CartStorageMixin, KeysetPaginationMixin, ModelViewSet):
     """
     ViewSet for managing shopping carts.
     
     Endpoints:
-    - GET /carts/ - List all carts
+    - GET /carts/ - List all carts (add ?paginate=cursor for keyset paging)
     - POST /carts/ - Create a new cart
     - GET /carts/{id}/ - Retrieve a cart
     - DELETE /carts/{id}/ - Delete a cart (clear cart)
+
+    Lines and totals are priced with promotions by store.pricing; add
+    ?summary=true to list or retrieve carts with their line count, unit
+    count and totals only, which one grouped query sums up without loading
+    the items. The listing filters on ?min_age= / ?max_age= (days) and
+    ?min_value= / ?max_value=, which bound the subtotal before promotions
+    that every cart shows next to its discounted total_price.
+
+    With the cache cart engine, everything but the listing (which reads
+    the flushed database state) is served from the cache.
     """
-    queryset = Cart.objects.prefetch_related('items__product').all()
+    # Explicit ordering: Meta.ordering is dropped once totals are aggregated
+    queryset = Cart.objects.order_by('-created_at', 'id')
     serializer_class = CartSerializer
     lookup_field = 'pk'
+    keyset_ordering = ('-created_at', 'id')
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = CartFilter
+
+    @property
+    def summary_only(self):
+        return self.request.query_params.get('summary') in ('true', '1')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        if self.summary_only:
+            return queryset.with_totals().with_promoted_items(list(pricing.discounts()))
+        return queryset.with_items()
+
+    def get_serializer_class(self):
+        if self.summary_only:
+            return CartSummarySerializer
+        return CartSerializer
+
+    def create(self, request, *args, **kwargs):
+        store = self.get_cart_store()
+        if store is None:
+            return super().create(request, *args, **kwargs)
+        cart = store.to_instance(store.create())
+        return Response(self.get_serializer(cart).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        store = self.get_cart_store()
+        if store is None:
+            return super().retrieve(request, *args, **kwargs)
+        cart = store.to_instance(self.get_cart_state(kwargs['pk']))
+        return Response(self.get_serializer(cart).data)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            carts.lock(instance.pk)
+            inventory.release(instance.pk)
+            instance.delete()
+
+    def destroy(self, request, *args, **kwargs):
+        store = self.get_cart_store()
+        if store is None:
+            return super().destroy(request, *args, **kwargs)
+        self.get_cart_state(kwargs['pk'])
+        store.delete(kwargs['pk'])
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post'])
     def clear(self, request, pk=None):
         """Clear all items from the cart"""
-        cart = self.get_object()
-        cart.items.all().delete()
+        store = self.get_cart_store()
+        if store is None:
+            cart = self.get_object()
+            with transaction.atomic():
+                carts.lock(cart.pk)
+                inventory.release(cart.pk)
+                cart.items.all().delete()
+                carts.touch(cart.pk)
+        else:
+            store.clear(self.get_cart_state(pk))
         return Response({'message': 'Cart cleared successfully'}, status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """
+        Fold another cart, e.g. the anonymous one of a shopper who just
+        logged in, into this one and delete it.
+
+        Body: {"from_cart": "<uuid>"}. Quantities of a product in both
+        carts are summed and capped at its inventory.
+        """
+        serializer = CartMergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        source_id = str(serializer.validated_data['from_cart'])
+        if source_id == str(pk):
+            return Response({'error': 'Cannot merge a cart into itself'}, status=status.HTTP_400_BAD_REQUEST)
 
-class CartItemViewSet(ModelViewSet):
+        store = self.get_cart_store()
+        if store is None:
+            try:
+                carts.merge(pk, source_id)
+            except (Cart.DoesNotExist, ValidationError):
+                raise Http404('No Cart matches the given query.')
+            cart = Cart.objects.with_items().get(pk=pk)
+        else:
+            state = self.get_cart_state(pk)
+            store.merge(state, self.get_cart_state(source_id))
+            cart = store.to_instance(state)
+        return Response(CartSerializer(cart).data)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def checkout(self, request, pk=None):
+        """
+        Place an order for the cart's lines and delete the cart.
+
+        The order is the signed-in user's; staff may send {"customer_id": 1}
+        to order for another customer. Answers 409 when a product can no
+        longer cover its line, leaving the cart untouched.
+        """
+        serializer = CheckoutSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+
+        store = self.get_cart_store()
+        customer_id = serializer.validated_data['customer_id']
+        try:
+            if store is None:
+                order = orders.checkout(pk, customer_id)
+            else:
+                cart_id = self.get_cart_state(pk)['id']
+                # No change may land between the persist and the delete
+                with store.lock(cart_id):
+                    # Check out what the customer sees, not the last flush
+                    store.persist([cart_id])
+                    order = orders.checkout(pk, customer_id)
+                    store.delete(cart_id)
+        except (Cart.DoesNotExist, ValidationError):
+            raise Http404('No Cart matches the given query.')
+        except orders.EmptyCart:
+            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+        except orders.OutOfStock as error:
+            return Response(
+                {'error': 'Insufficient inventory', 'products': error.product_ids},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        order = Order.objects.with_items().get(pk=order.pk)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+
+
+class CartItemViewSet(CartStorageMixin, ModelViewSet):
     """
     ViewSet for managing cart items.
     
@@ -170,6 +470,8 @@ class CartItemViewSet(ModelViewSet):
     - GET /carts/{cart_pk}/items/{id}/ - Retrieve a cart item
     - PATCH/PUT /carts/{cart_pk}/items/{id}/ - Update item quantity
     - DELETE /carts/{cart_pk}/items/{id}/ - Remove item from cart
+
+    With the cache cart engine an item's id is its product id.
     """
     http_method_names = ['get', 'post', 'patch', 'delete']
     serializer_class = CartItemSerializer
@@ -180,7 +482,184 @@ class CartItemViewSet(ModelViewSet):
     def get_serializer_context(self):
         return {'cart_id': self.kwargs['cart_pk']}
 
+    def get_cached_items(self, state):
+        return {
+            item.product_id: item
+            for item in self.get_cart_store().to_instance(state).items.all()
+        }
+
+    def get_cached_item(self, state, pk):
+        try:
+            product_id = int(pk)
+        except ValueError:
+            raise Http404('No CartItem matches the given query.')
+        if product_id not in state['items']:
+            raise Http404('No CartItem matches the given query.')
+        return product_id
+
+    def list(self, request, *args, **kwargs):
+        if self.get_cart_store() is None:
+            return super().list(request, *args, **kwargs)
+        state = self.get_cart_state(kwargs['cart_pk'])
+        items = list(self.get_cached_items(state).values())
+        page = self.paginate_queryset(items)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(items, many=True).data)
+
+    def create(self, request, *args, **kwargs):
+        store = self.get_cart_store()
+        if store is None:
+            return super().create(request, *args, **kwargs)
+        state = self.get_cart_state(kwargs['cart_pk'])
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product_id = serializer.validated_data['product_id']
+        store.add_item(state, product_id, serializer.validated_data['quantity'])
+        item = self.get_cached_items(state)[product_id]
+        return Response(self.get_serializer(item).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.get_cart_store() is None:
+            return super().retrieve(request, *args, **kwargs)
+        state = self.get_cart_state(kwargs['cart_pk'])
+        product_id = self.get_cached_item(state, kwargs['pk'])
+        return Response(self.get_serializer(self.get_cached_items(state)[product_id]).data)
+
+    def partial_update(self, request, *args, **kwargs):
+        store = self.get_cart_store()
+        if store is None:
+            return super().partial_update(request, *args, **kwargs)
+        state = self.get_cart_state(kwargs['cart_pk'])
+        product_id = self.get_cached_item(state, kwargs['pk'])
+        serializer = self.get_serializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        if 'quantity' in serializer.validated_data:
+            store.set_item(state, product_id, serializer.validated_data['quantity'])
+        return Response(self.get_serializer(self.get_cached_items(state)[product_id]).data)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            carts.lock(instance.cart_id)
+            inventory.hold(instance.cart_id, {instance.product_id: 0})
+            instance.delete()
+            carts.touch(instance.cart_id)
+
+    def destroy(self, request, *args, **kwargs):
+        store = self.get_cart_store()
+        if store is None:
+            return super().destroy(request, *args, **kwargs)
+        state = self.get_cart_state(kwargs['cart_pk'])
+        store.remove_item(state, self.get_cached_item(state, kwargs['pk']))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request, *args, **kwargs):
+        """
+        Apply many item changes at once and return the updated cart.
+
+        Body: {"operations": [{"op": "add", "product_id": 1, "quantity": 2},
+        {"op": "set", "product_id": 2, "quantity": 1},
+        {"op": "remove", "product_id": 3}]}
+        """
+        serializer = CartItemBatchSerializer(
+            data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+
+        store = self.get_cart_store()
+        if store is None:
+            get_object_or_404(Cart, pk=kwargs['cart_pk'])
+            serializer.save()
+            cart = Cart.objects.with_items().get(pk=kwargs['cart_pk'])
+        else:
+            state = self.get_cart_state(kwargs['cart_pk'])
+            store.apply_batch(state, serializer.validated_data['operations'])
+            cart = store.to_instance(state)
+        return Response(CartSerializer(cart).data)
+
 
 class CustomerViewSet(CreateModelMixin, ListModelMixin, GenericViewSet):
     queryset = Customer.objects.all()
-    serializer_class = CustomerSerializer
\ No newline at end of file
+    serializer_class = CustomerSerializer
+
+    def perform_create(self, serializer):
+        # A signed-in user's first customer is the one they check out as
+        user = self.request.user
+        if user.is_authenticated and not Customer.objects.filter(user=user).exists():
+            serializer.save(user=user)
+        else:
+            serializer.save()
+
+
+class OrderViewSet(RetrieveModelMixin, GenericViewSet):
+    """
+    Endpoints:
+    - GET /orders/{id}/ - Retrieve an order with its lines and totals
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        return Order.objects.with_items()
+
+
+class CustomerOrderViewSet(KeysetPaginationMixin, ListModelMixin, OrderViewSet):
+    """
+    Order history of a customer, newest first.
+
+    Endpoints:
+    - GET /customers/{customer_pk}/orders/ - List the customer's orders
+    - GET /customers/{customer_pk}/orders/{id}/ - Retrieve one of them
+
+    Pages are always fetched by keyset on (customer, -placed_at, -id),
+    which store_order_customer_seek_idx covers; totals are stored on the
+    order and the lines come from one prefetch query per page.
+    """
+    keyset_ordering = ('-placed_at', '-id')
+    keyset_always = True
+
+    def get_queryset(self):
+        return super().get_queryset().filter(customer_id=self.kwargs['customer_pk'])
+
+
+class SalesReportViewSet(GenericViewSet):
+    """
+    Sales figures, read from the DailySales rollup only, so they are as of
+    the last refresh_sales_rollup run.
+
+    Endpoints:
+    - GET /reports/sales/days/ - Units and revenue per day, newest first
+    - GET /reports/sales/products/ - Orders, units and revenue per product, best sellers first
+    - GET /reports/sales/collections/ - Units and revenue per collection, best sellers first
+
+    Filter with ?start= and ?end= (YYYY-MM-DD, both included), ?collection= or ?product=.
+    """
+    queryset = DailySales.objects.all()
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = SalesFilter
+
+    def report(self, serializer_class, group, ordering, **totals):
+        rows = self.filter_queryset(self.get_queryset()) \
+            .order_by() \
+            .values(*group) \
+            .annotate(units=Sum('units'), revenue=Sum('revenue'), **totals) \
+            .order_by(*ordering)
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(serializer_class(page, many=True).data)
+
+    @action(detail=False)
+    def days(self, request):
+        return self.report(SalesDaySerializer, ['day'], ['-day'])
+
+    @action(detail=False)
+    def products(self, request):
+        return self.report(
+            SalesProductSerializer, ['product_id', 'product__title'],
+            ['-revenue', 'product_id'], orders=Sum('orders'))
+
+    @action(detail=False)
+    def collections(self, request):
+        return self.report(
+            SalesCollectionSerializer, ['collection_id', 'collection__title'],
+            ['-revenue', 'collection_id'])
@@ -155,6 +155,35 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 5
 
 }
+# Must be shared by every process: web workers and management commands
+# bump the catalog versions, flush cached carts and read the cache stats.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    }
+}
+
+# Seconds a cached catalog response stays valid; entries are also dropped
+# whenever a Product, Collection or Promotion changes.
+STORE_RESPONSE_CACHE_TIMEOUT = 300
+
+# Where live carts are kept: 'database' or 'cache'. With 'cache', run
+# `python manage.py flush_carts --loop` to persist them; see store.carts.
+STORE_CART_STORAGE = {
+    'ENGINE': 'database',
+    'WRITE_THROUGH': False,
+    'FLUSH_INTERVAL': 30,
+}
+
+# Seconds a cart's reservation of stock lasts without activity; expired
+# holds are released by `python manage.py sweep_holds`.
+STORE_INVENTORY_HOLD_TTL = 15 * 60
+
+# Rows per transaction of bulk admin actions, which are queued and run by
+# `python manage.py run_admin_jobs --loop`; see store.jobs.
+STORE_ADMIN_JOB_CHUNK_SIZE = 1000
+
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('JWT',),
      'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),